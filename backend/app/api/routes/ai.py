@@ -21,6 +21,9 @@ class TestConnectionRequest(BaseModel):
     api_key: str = Field(..., description="API key")
     base_url: Optional[str] = Field(None, description="Custom base URL")
 
+class TestAllConnectionsRequest(BaseModel):
+    providers: List[TestConnectionRequest] = Field(..., description="Providers to test")
+
 class GenerateCommentsRequest(BaseModel):
     file_path: str = Field(..., description="File path to generate comments for")
     file_content: str = Field(..., description="File content")
@@ -51,7 +54,8 @@ class ProviderConfig(BaseModel):
     default_base_url: str
     requires_api_key: bool
 
-ai_manager = AIManager()
+# 与智能对话管理器共用同一个AIManager实例，避免模块内重复持有两套供应商对象
+ai_manager: AIManager = advanced_smart_conversation_manager.ai_manager
 
 @router.get("/providers")
 async def get_providers() -> Dict[str, ProviderConfig]:
@@ -90,6 +94,12 @@ async def test_connection(request: TestConnectionRequest) -> Dict[str, bool]:
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@router.post("/test-all-connections")
+async def test_all_connections(request: TestAllConnectionsRequest) -> Dict[str, bool]:
+    """并发测试多个AI供应商连接"""
+    creds = {item.provider: (item.api_key, item.base_url) for item in request.providers}
+    return await ai_manager.test_all_connections(creds)
+
 @router.get("/models/{provider}")
 async def get_models(provider: str) -> List[str]:
     """获取指定供应商的可用模型"""
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import os
@@ -10,6 +11,13 @@ class CloneRequest(BaseModel):
     url: str = Field(..., description="Git repository URL")
     path: Optional[str] = Field(None, description="Local path to clone to")
 
+class CloneManyRequest(BaseModel):
+    urls: List[str] = Field(..., description="Git repository URLs")
+    path: Optional[str] = Field(None, description="Local path to clone to")
+
+class PullManyRequest(BaseModel):
+    paths: List[str] = Field(..., description="Project paths")
+
 class ProjectPath(BaseModel):
     path: str = Field(..., description="Project path")
 
@@ -36,11 +44,23 @@ async def clone_repository(request: CloneRequest) -> Dict[str, Any]:
     
     return result
 
+@router.post("/clone-many")
+async def clone_many(request: CloneManyRequest) -> List[Dict[str, Any]]:
+    """并发克隆多个Git仓库"""
+    manager = GitManager().get_manager()
+    return await manager.clone_many(request.urls, request.path)
+
+@router.post("/pull-many")
+async def pull_many(request: PullManyRequest) -> List[Dict[str, Any]]:
+    """并发拉取多个项目的更新"""
+    manager = GitManager().get_manager()
+    return await manager.pull_many(request.paths)
+
 @router.get("/projects")
 async def list_projects() -> List[Dict[str, Any]]:
     """列出所有Git项目"""
     manager = GitManager().get_manager()
-    return manager.list_projects()
+    return await manager.list_projects()
 
 @router.get("/projects/search")
 async def search_projects(query: str = Query(..., description="Search query")) -> List[Dict[str, Any]]:
@@ -48,6 +68,12 @@ async def search_projects(query: str = Query(..., description="Search query")) -
     manager = GitManager().get_manager()
     return await manager.search_projects(query)
 
+@router.get("/statuses")
+async def get_all_project_statuses() -> Dict[str, Dict[str, Any]]:
+    """批量获取所有项目状态"""
+    manager = GitManager().get_manager()
+    return await manager.get_all_project_statuses()
+
 @router.get("/projects/{project_path:path}")
 async def get_project_overview(project_path: str) -> Dict[str, Any]:
     """获取项目概览"""
@@ -98,10 +124,27 @@ async def get_file_content(request: FileRequest) -> Dict[str, Any]:
     
     content = project.get_file_content(request.file_path)
     if content is None:
+        if project.is_binary_file(request.file_path):
+            raise HTTPException(status_code=415, detail="Binary file cannot be displayed as text")
         raise HTTPException(status_code=404, detail="File not found or cannot be read")
     
     return {"content": content, "file_path": request.file_path}
 
+@router.post("/projects/file/stream")
+async def stream_file_content(request: FileRequest) -> StreamingResponse:
+    """以流的形式返回文件原始内容，适用于大文件"""
+    manager = GitManager().get_manager()
+    project = manager.get_project(request.path)
+    
+    if not project or not project.is_valid():
+        raise HTTPException(status_code=404, detail="Project not found or invalid")
+    
+    chunks = project.iter_file_chunks(request.file_path)
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="File not found or cannot be read")
+    
+    return StreamingResponse(chunks, media_type="application/octet-stream")
+
 @router.get("/projects/{project_path:path}/commits")
 async def get_recent_commits(
     project_path: str,
@@ -168,10 +211,13 @@ async def pull_updates(project_path: str) -> Dict[str, Any]:
     return result
 
 @router.get("/projects/{project_path:path}/status")
-async def get_project_status(project_path: str) -> Dict[str, Any]:
+async def get_project_status(
+    project_path: str,
+    refresh: bool = Query(False, description="Fetch from remote before comparing")
+) -> Dict[str, Any]:
     """获取项目状态（是否有更新等）"""
     manager = GitManager().get_manager()
-    status = manager.get_project_status(project_path)
+    status = await manager.get_project_status(project_path, refresh)
     
     if "error" in status:
         raise HTTPException(status_code=404, detail=status["error"])
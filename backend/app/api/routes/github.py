@@ -3,15 +3,17 @@ from pydantic import BaseModel
 from typing import List, Dict, Optional
 import asyncio
 from datetime import datetime, timedelta
-from app.services.github_service import GitHubService
+from app.services.github_service import GitHubService, TRENDING_CACHE_TTL
 from app.core.github_config import GitHubConfig
 from app.core.github_recommendation_db import github_recommendation_db
 
 router = APIRouter()
 github_config = GitHubConfig()
 
-# 启动时缓存的热门项目
+# 启动时缓存的热门项目，由后台任务在缓存过期前定期刷新
 trending_cache = []
+TRENDING_REFRESH_INTERVAL = max(TRENDING_CACHE_TTL - 60, 60)
+_trending_refresh_task: Optional[asyncio.Task] = None
 
 class GitHubTestRequest(BaseModel):
     access_token: str
@@ -39,22 +41,46 @@ class RecordActionRequest(BaseModel):
     search_query: Optional[str] = None
     duration_seconds: Optional[int] = None
 
-@router.on_event("startup")
-async def startup_event():
-    """启动时获取热门项目"""
+async def load_trending(refresh: bool = False):
+    """获取热门项目并更新缓存；获取失败时保留上一次的结果"""
     global trending_cache
     access_token = github_config.get_access_token()
     if access_token and access_token.strip():
         service = GitHubService(access_token)
         try:
-            trending_cache = await service.get_weekly_trending()
+            repos = await service.get_weekly_trending(refresh=refresh)
+            if repos:
+                trending_cache = repos
             print(f"成功加载 {len(trending_cache)} 个热门GitHub项目")
         except Exception as e:
-            print(f"启动时获取热门项目失败: {e}")
-            trending_cache = []
+            print(f"获取热门项目失败: {e}")
     else:
         print("未配置GitHub access token，跳过热门项目加载")
 
+async def _refresh_trending_forever():
+    """在热门项目缓存过期前重新获取，使推荐请求不必承担冷缓存的延迟"""
+    while True:
+        # 跳过缓存有效期，借助 ETag 条件请求在过期前完成重新验证
+        await load_trending(refresh=True)
+        await asyncio.sleep(TRENDING_REFRESH_INTERVAL)
+
+def start_trending_refresher():
+    """启动热门项目后台刷新任务，同一进程内只启动一个"""
+    global _trending_refresh_task
+    if _trending_refresh_task is None or _trending_refresh_task.done():
+        _trending_refresh_task = asyncio.create_task(_refresh_trending_forever())
+
+async def stop_trending_refresher():
+    """停止热门项目后台刷新任务"""
+    global _trending_refresh_task
+    task, _trending_refresh_task = _trending_refresh_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
 @router.get("/github/trending")
 async def get_trending_repos():
     """获取缓存的热门项目"""
@@ -94,9 +120,9 @@ async def get_repo_details(owner: str, repo: str):
     
     service = GitHubService(access_token)
     try:
-        details = await service.get_repo_details(owner, repo)
-        readme = await service.get_readme(owner, repo)
-        details["readme"] = readme
+        bundle = await service.get_repo_bundle(owner, repo)
+        details = bundle["details"]
+        details["readme"] = bundle["readme"]
         return details
     except HTTPException:
         raise
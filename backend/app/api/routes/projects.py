@@ -32,7 +32,7 @@ class AIManager:
 async def get_all_projects() -> List[Dict[str, Any]]:
     """获取所有项目列表"""
     manager = GitManager().get_manager()
-    return manager.list_projects()
+    return await manager.list_projects()
 
 @router.get("/{project_path:path}/summary")
 async def get_project_summary(project_path: str) -> Dict[str, Any]:
@@ -1,10 +1,86 @@
 import asyncio
+import hashlib
+import io
+import os
 from typing import Dict, Any, List, Optional
-import json
 import re
+import time
+from collections import OrderedDict
 from datetime import datetime
+
+import orjson
+
 from app.core.ai_manager import AIManager
-from app.core.mcp_server import McpServer
+
+# AI配置文件候选路径（按优先级，模块加载时计算一次并去重）
+_CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+_AI_CONFIG_PATHS = tuple(dict.fromkeys(
+    os.path.normpath(path) for path in (
+        os.path.join(_CURRENT_DIR, '..', 'api', 'AI-Config.json'),  # backend/app/api/AI-Config.json
+        os.path.join(_CURRENT_DIR, '..', '..', 'api', 'AI-Config.json'),  # backend/api/AI-Config.json
+        os.path.join(_CURRENT_DIR, '..', '..', '..', 'AI-Config.json'),   # AI-Config.json
+    )
+))
+
+# 文件内容缓存的总字节预算，超出后按最近最少使用淘汰
+FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# 回答提示词中每个文件保留的最大字符数及文件之间的分隔线
+_SUMMARY_CHARS = 1000
+# 路径修正时探测候选文件读取的字节数
+PROBE_HEAD_BYTES = 1200
+_SEP = "\n" + "-" * 50
+
+# 回答生成提示词模板，静态部分只在模块加载时构建一次
+_GENERATE_PROMPT = """你是一个专业的代码分析助手。请基于以下文件内容直接回答用户的问题。
+
+用户问题: {user_query}
+项目路径: {project_path}
+{context_info}
+相关文件内容:
+{file_summary}
+
+请直接针对用户的问题提供准确的答案，保持回答简洁、直接、实用。
+请使用中文回答，语言自然易懂。"""
+
+_SYS_GENERATE_MSG = {"role": "system", "content": "你是一个专业的代码分析助手，擅长基于代码文件内容提供深入的项目分析。"}
+
+def _hash(data: bytes) -> str:
+    """生成缓存键用的短指纹（blake2b，8字节）"""
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+# 文件选择结果和AI回答的缓存有效期（秒）与最大条目数
+RESULT_CACHE_TTL = 300
+RESULT_CACHE_SIZE = 256
+
+def _ttl_cache_get(cache: Dict[tuple, tuple], key: tuple) -> Any:
+    """读取TTL缓存，未命中或已过期返回 None"""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] >= RESULT_CACHE_TTL:
+        del cache[key]
+        return None
+    return entry[1]
+
+def _ttl_cache_put(cache: Dict[tuple, tuple], key: tuple, value: Any):
+    """写入TTL缓存，超过容量时按插入顺序淘汰最早的条目"""
+    cache.pop(key, None)
+    cache[key] = (time.monotonic(), value)
+    while len(cache) > RESULT_CACHE_SIZE:
+        del cache[next(iter(cache))]
+
+def _read_env_defaults() -> Dict[str, Any]:
+    """从环境变量读取AI配置，未找到配置文件时使用"""
+    return {
+        "provider": os.getenv("AI_PROVIDER", "openai"),
+        "model": os.getenv("AI_MODEL", "gpt-4o-mini"),
+        "api_key": os.getenv("AI_API_KEY", ""),
+        "base_url": os.getenv("AI_BASE_URL")
+    }
+
+# 环境变量配置在导入时读取一次，POSIX 下可通过 SIGHUP 重新加载
+_ENV_DEFAULTS = _read_env_defaults()
 
 class IntentRecognizer:
     """意图识别器 - 基于查询内容智能选择文件"""
@@ -37,6 +113,10 @@ class IntentRecognizer:
     def __init__(self):
         from app.core.project_mcp_server import project_mcp_server
         self.project_mcp_server = project_mcp_server
+        # 项目文件树缓存: 项目路径 -> (文件列表指纹, 文件树)
+        self._tree_cache: Dict[str, tuple] = {}
+        # 文件选择结果缓存: (项目路径, 查询指纹, 文件树指纹) -> (时间, 文件列表)
+        self._analysis_cache: Dict[tuple, tuple] = {}
     
     def extract_keywords(self, query: str) -> List[str]:
         """提取查询中的关键词"""
@@ -64,8 +144,17 @@ class IntentRecognizer:
             result = await self.project_mcp_server.list_project_files(project_path, max_depth=10)
             
             if result.get("success") and result.get("files"):
+                # 文件列表未变化时复用已构建的树，避免每轮对话重复构建
+                files = result["files"]
+                fingerprint = _hash(orjson.dumps(files, option=orjson.OPT_SORT_KEYS))
+                cached = self._tree_cache.get(project_path)
+                if cached is not None and cached[0] == fingerprint:
+                    return cached[1]
+                
                 # 将文件列表转换为树形结构
-                return self._build_file_tree(result["files"])
+                tree = self._build_file_tree(files)
+                self._tree_cache[project_path] = (fingerprint, tree)
+                return tree
             else:
                 return {"name": "project", "type": "directory", "children": []}
                 
@@ -236,6 +325,20 @@ class IntentRecognizer:
         # 2. 获取项目结构
         project_structure = await self.get_project_structure(project_path)
         
+        # 相同项目、相同问题且文件树未变化时直接复用上次的选择结果
+        tree_entry = self._tree_cache.get(project_path)
+        cache_key = None
+        if tree_entry is not None and tree_entry[1] is project_structure:
+            cache_key = (
+                project_path,
+                _hash(query.encode('utf-8')),
+                tree_entry[0]
+            )
+            cached = _ttl_cache_get(self._analysis_cache, cache_key)
+            if cached is not None:
+                print(f"  命中文件选择缓存，共 {len(cached)} 个文件")
+                return cached
+        
         # 3. 智能文件匹配
         suggested_files = self.match_files_to_query(project_structure, keywords, file_types)
         print(f"  匹配到 {len(suggested_files)} 个文件")
@@ -244,7 +347,10 @@ class IntentRecognizer:
         prioritized_files = self.prioritize_and_deduplicate(suggested_files)
         print(f"  去重后剩余 {len(prioritized_files)} 个文件")
         
-        return prioritized_files[:8]  # 返回最多8个文件
+        selected_files = prioritized_files[:8]  # 返回最多8个文件
+        if cache_key is not None:
+            _ttl_cache_put(self._analysis_cache, cache_key, selected_files)
+        return selected_files
 
 
 class AutoFileReader:
@@ -253,52 +359,106 @@ class AutoFileReader:
     def __init__(self):
         from app.core.project_mcp_server import project_mcp_server
         self.project_mcp_server = project_mcp_server
+        # 文件内容LRU缓存: (项目路径, 文件路径, mtime_ns, 大小) -> 内容
+        self._file_cache: OrderedDict = OrderedDict()
+        self._file_cache_bytes = 0
+        self._file_cache_lock = asyncio.Lock()
     
     async def read_files(self, project_path: str, file_requests: List[Dict[str, Any]]) -> Dict[str, str]:
-        """自动读取多个文件"""
+        """自动读取多个文件 - 并发读取，耗时取决于最慢的单个文件"""
         file_contents = {}
         
         print(f"📖 开始读取 {len(file_requests)} 个文件...")
         
-        for file_request in file_requests:
-            file_path = file_request["file_path"]
-            reason = file_request.get("reason", "")
-            
-            try:
-                content = await self.read_file(project_path, file_path)
-                if content:
-                    file_contents[file_path] = content
-                    print(f"   ✓ {file_path} - {reason}")
-                else:
-                    print(f"   ⚠️ {file_path} - 文件为空")
-            except Exception as e:
-                print(f"   ❌ {file_path} - 读取失败: {str(e)}")
-                # 尝试路径修正
-                corrected_path = await self.try_correct_path(project_path, file_path)
-                if corrected_path:
-                    try:
-                        content = await self.read_file(project_path, corrected_path)
-                        if content:
-                            file_contents[corrected_path] = content
-                            print(f"   ✓ {corrected_path} - 路径修正后成功读取")
-                    except:
-                        print(f"   ❌ {corrected_path} - 路径修正后仍然失败")
+        results = await asyncio.gather(
+            *(self._read_requested_file(project_path, file_request) for file_request in file_requests),
+            return_exceptions=True
+        )
+        
+        # 按请求顺序汇总结果
+        for file_request, result in zip(file_requests, results):
+            if isinstance(result, BaseException):
+                print(f"   ❌ {file_request['file_path']} - 读取失败: {str(result)}")
+            elif result:
+                file_path, content = result
+                file_contents[file_path] = content
         
         print(f"✅ 成功读取 {len(file_contents)}/{len(file_requests)} 个文件")
         return file_contents
     
+    async def _read_requested_file(self, project_path: str, file_request: Dict[str, Any]) -> Optional[tuple]:
+        """读取单个请求的文件，失败时尝试路径修正，返回 (实际路径, 内容)"""
+        file_path = file_request["file_path"]
+        reason = file_request.get("reason", "")
+        
+        try:
+            content = await self.read_file(project_path, file_path)
+            if content:
+                print(f"   ✓ {file_path} - {reason}")
+                return file_path, content
+            print(f"   ⚠️ {file_path} - 文件为空")
+        except Exception as e:
+            print(f"   ❌ {file_path} - 读取失败: {str(e)}")
+            # 尝试路径修正
+            corrected_path = await self.try_correct_path(project_path, file_path)
+            if corrected_path:
+                try:
+                    content = await self.read_file(project_path, corrected_path)
+                    if content:
+                        print(f"   ✓ {corrected_path} - 路径修正后成功读取")
+                        return corrected_path, content
+                except:
+                    print(f"   ❌ {corrected_path} - 路径修正后仍然失败")
+        return None
+    
     async def read_file(self, project_path: str, file_path: str) -> Optional[str]:
-        """读取单个文件"""
+        """读取单个文件，文件未修改时直接返回缓存内容"""
         try:
+            cache_key = await asyncio.to_thread(self._file_cache_key, project_path, file_path)
+            if cache_key is not None:
+                async with self._file_cache_lock:
+                    content = self._file_cache.get(cache_key)
+                    if content is not None:
+                        self._file_cache.move_to_end(cache_key)
+                        return content
+            
             result = await self.project_mcp_server.read_project_file(project_path, file_path)
             
             if result.get("success") and result.get("content"):
-                return result["content"]
+                content = result["content"]
+                if cache_key is not None:
+                    await self._cache_file_content(cache_key, content)
+                return content
             return None
         except Exception as e:
             print(f"读取文件异常 {file_path}: {str(e)}")
             return None
     
+    def _file_cache_key(self, project_path: str, file_path: str) -> Optional[tuple]:
+        """根据文件的 mtime 和大小生成缓存键，文件不可访问时返回 None"""
+        try:
+            abs_file_path = self.project_mcp_server._validate_file_path(project_path, file_path)
+            st = os.stat(abs_file_path)
+        except Exception:
+            return None
+        return (project_path, file_path, st.st_mtime_ns, st.st_size)
+    
+    async def _cache_file_content(self, cache_key: tuple, content: str):
+        """写入文件内容缓存，按文件大小计入预算并淘汰最久未使用的条目"""
+        size = cache_key[3]
+        if size > FILE_CACHE_MAX_BYTES:
+            return
+        
+        async with self._file_cache_lock:
+            if cache_key in self._file_cache:
+                self._file_cache.move_to_end(cache_key)
+                return
+            self._file_cache[cache_key] = content
+            self._file_cache_bytes += size
+            while self._file_cache_bytes > FILE_CACHE_MAX_BYTES:
+                evicted_key, _ = self._file_cache.popitem(last=False)
+                self._file_cache_bytes -= evicted_key[3]
+    
     async def try_correct_path(self, project_path: str, original_path: str) -> Optional[str]:
         """尝试修正文件路径"""
         # 简单的路径修正逻辑
@@ -328,7 +488,8 @@ class AutoFileReader:
                 continue
                 
             try:
-                result = await self.project_mcp_server.read_project_file(project_path, corrected_path)
+                # 只需确认文件可读且非空，读取开头部分即可
+                result = await self.project_mcp_server.read_project_file_head(project_path, corrected_path, PROBE_HEAD_BYTES)
                 if result.get("success") and result.get("content"):
                     return corrected_path
             except:
@@ -382,50 +543,48 @@ class AdvancedSmartConversationManager:
         self.file_reader = AutoFileReader()
         self.file_context_tracker = FileContextTracker()
         self.conversations = {}
+        # AI配置缓存: 仅在配置文件mtime变化时重新解析
+        self._ai_config_cache: Optional[Dict[str, Any]] = None
+        self._ai_config_path: Optional[str] = None
+        self._ai_config_mtime = 0
+        # AI回答缓存: (服务商, 模型, base_url, 提示词指纹) -> (时间, 回答)
+        self._response_cache: Dict[tuple, tuple] = {}
     
     def _get_ai_config(self) -> Dict[str, Any]:
-        """获取AI配置 - 每次调用都重新读取配置文件"""
+        """获取AI配置 - 按配置文件mtime缓存，文件未变化时只需一次stat"""
         try:
-            import json
-            import os
-            
-            # 获取当前文件所在目录
-            current_dir = os.path.dirname(__file__)
-            
-            # 构建正确的配置文件路径（从当前文件位置计算）
-            config_paths = [
-                os.path.join(current_dir, '..', 'api', 'AI-Config.json'),  # backend/app/api/AI-Config.json
-                os.path.join(current_dir, '..', '..', 'api', 'AI-Config.json'),  # backend/api/AI-Config.json
-                os.path.join(current_dir, '..', '..', '..', 'AI-Config.json'),   # AI-Config.json
-            ]
-            
-            # 添加绝对路径检查并去重
-            abs_config_paths = []
-            for path in config_paths:
-                abs_path = os.path.abspath(path)
-                if abs_path not in abs_config_paths:
-                    abs_config_paths.append(abs_path)
-            
-            # 添加调试信息
-            print(f"🔍 查找AI配置文件，检查以下路径:")
-            for i, path in enumerate(abs_config_paths, 1):
-                exists = os.path.exists(path)
-                print(f"  {i}. {path} - {'✅ 存在' if exists else '❌ 不存在'}")
+            if self._ai_config_path is not None:
+                try:
+                    mtime = os.stat(self._ai_config_path).st_mtime_ns
+                    if mtime == self._ai_config_mtime:
+                        return dict(self._ai_config_cache)
+                except OSError:
+                    pass
+                self._ai_config_cache = None
+                self._ai_config_path = None
+                self._ai_config_mtime = 0
             
             config = None
             config_path = None
-            for path in abs_config_paths:
-                if os.path.exists(path):
+            config_mtime = 0
+            for path in _AI_CONFIG_PATHS:
+                # 直接打开候选文件，mtime 取自已打开的句柄，省去单独的存在性检查
+                try:
+                    f = open(path, 'rb')
+                except OSError:
+                    print(f"  {path} - ❌ 不存在")
+                    continue
+                print(f"📄 读取AI配置文件: {path}")
+                try:
+                    with f:
+                        config_mtime = os.fstat(f.fileno()).st_mtime_ns
+                        config = orjson.loads(f.read())
                     config_path = path
-                    print(f"📄 读取AI配置文件: {path}")
-                    try:
-                        with open(path, 'r', encoding='utf-8') as f:
-                            config = json.load(f)
-                        print(f"✅ 成功读取配置文件")
-                        break
-                    except Exception as e:
-                        print(f"❌ 读取配置文件失败 {path}: {str(e)}")
-                        continue
+                    print(f"✅ 成功读取配置文件")
+                    break
+                except Exception as e:
+                    print(f"❌ 读取配置文件失败 {path}: {str(e)}")
+                    continue
             
             if config:
                 print(f"🤖 使用AI配置: {config.get('ai_provider', 'unknown')}")
@@ -434,25 +593,22 @@ class AdvancedSmartConversationManager:
                 if not api_key:
                     print("⚠️ 警告: AI配置文件中缺少api_key")
                 
-                return {
+                self._ai_config_cache = {
                     "provider": config.get("ai_provider", "openai"),
                     "model": config.get("ai_model", "gpt-4o-mini"),
                     "api_key": api_key,
                     "base_url": config.get("ai_base_url")
                 }
+                self._ai_config_path = config_path
+                self._ai_config_mtime = config_mtime
+                return dict(self._ai_config_cache)
             
-            # 检查环境变量
+            # 使用导入时读取的环境变量配置
             print("ℹ️ 未找到AI配置文件，使用环境变量")
-            env_api_key = os.getenv("AI_API_KEY", "")
-            if not env_api_key:
+            if not _ENV_DEFAULTS["api_key"]:
                 print("⚠️ 警告: 环境变量中缺少AI_API_KEY")
             
-            return {
-                "provider": os.getenv("AI_PROVIDER", "openai"),
-                "model": os.getenv("AI_MODEL", "gpt-4o-mini"),
-                "api_key": env_api_key,
-                "base_url": os.getenv("AI_BASE_URL")
-            }
+            return dict(_ENV_DEFAULTS)
             
         except Exception as e:
             print(f"❌ 读取AI配置失败: {str(e)}")
@@ -466,10 +622,18 @@ class AdvancedSmartConversationManager:
     async def generate_response(self, project_path: str, user_query: str, file_contents: Dict[str, str], context: Dict[str, Any] = None) -> str:
         """基于文件内容生成回答"""
         # 构建文件内容摘要
-        file_summary = "\n".join([
-            f"文件: {file_path}\n内容:\n{content[:1000]}...\n{'-'*50}"
-            for file_path, content in file_contents.items()
-        ])
+        # 逐段写入缓冲区，只在最后拼接一次；短文件无需切片复制
+        buf = io.StringIO()
+        for file_path, content in file_contents.items():
+            if buf.tell():
+                buf.write("\n")
+            buf.write("文件: ")
+            buf.write(file_path)
+            buf.write("\n内容:\n")
+            buf.write(content if len(content) <= _SUMMARY_CHARS else content[:_SUMMARY_CHARS])
+            buf.write("...")
+            buf.write(_SEP)
+        file_summary = buf.getvalue()
         
         # 添加上下文信息
         context_info = ""
@@ -479,24 +643,32 @@ class AdvancedSmartConversationManager:
                 for file_path, info in context.items()
             ]) + "\n"
         
-        prompt = f"""你是一个专业的代码分析助手。请基于以下文件内容直接回答用户的问题。
-
-用户问题: {user_query}
-项目路径: {project_path}
-{context_info}
-相关文件内容:
-{file_summary}
-
-请直接针对用户的问题提供准确的答案，保持回答简洁、直接、实用。
-请使用中文回答，语言自然易懂。"""
+        prompt = _GENERATE_PROMPT.format(
+            user_query=user_query,
+            project_path=project_path,
+            context_info=context_info,
+            file_summary=file_summary
+        )
 
         messages = [
-            {"role": "system", "content": "你是一个专业的代码分析助手，擅长基于代码文件内容提供深入的项目分析。"},
+            _SYS_GENERATE_MSG,
             {"role": "user", "content": prompt}
         ]
         
         ai_config = self._get_ai_config()
         
+        # 相同配置下发送相同提示词时，在有效期内直接返回上次的回答，省去一次AI调用
+        cache_key = (
+            ai_config["provider"],
+            ai_config["model"],
+            ai_config.get("base_url"),
+            _hash(prompt.encode('utf-8'))
+        )
+        cached = _ttl_cache_get(self._response_cache, cache_key)
+        if cached is not None:
+            print("  命中回答缓存")
+            return cached
+        
         response = await self.ai_manager.chat(
             provider=ai_config["provider"],
             model=ai_config["model"],
@@ -507,6 +679,7 @@ class AdvancedSmartConversationManager:
             max_tokens=1500
         )
         
+        _ttl_cache_put(self._response_cache, cache_key, response["content"])
         return response["content"]
     
     async def process_smart_chat(self, conversation_id: str, project_path: str, user_query: str) -> Dict[str, Any]:
@@ -592,3 +765,11 @@ class AdvancedSmartConversationManager:
 
 # 创建全局实例
 advanced_smart_conversation_manager = AdvancedSmartConversationManager()
+
+def reload_ai_config():
+    """重新读取环境变量并清空AI配置缓存（由 main.py 注册为 SIGHUP 处理函数）"""
+    global _ENV_DEFAULTS
+    _ENV_DEFAULTS = _read_env_defaults()
+    advanced_smart_conversation_manager._ai_config_cache = None
+    advanced_smart_conversation_manager._ai_config_path = None
+    advanced_smart_conversation_manager._ai_config_mtime = 0
@@ -1,5 +1,6 @@
 import os
-from typing import Dict, List, Any, Optional
+import asyncio
+from typing import Dict, List, Any, Optional, Tuple
 from abc import ABC, abstractmethod
 import openai
 import anthropic
@@ -78,11 +79,8 @@ class AnthropicProvider(AIProvider):
     async def test_connection(self, api_key: str, base_url: Optional[str] = None) -> bool:
         try:
             client = anthropic.AsyncAnthropic(api_key=api_key, base_url=base_url)
-            await client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=10,
-                messages=[{"role": "user", "content": "Hello"}]
-            )
+            # 列出模型即可验证密钥，无需发起计费的消息请求
+            await client.models.list(limit=1)
             return True
         except Exception:
             return False
@@ -122,9 +120,9 @@ class GeminiProvider(AIProvider):
     async def test_connection(self, api_key: str, base_url: Optional[str] = None) -> bool:
         try:
             genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-pro')
-            response = await model.generate_content_async("Hello")
-            return bool(response.text)
+            # list_models 是同步接口，放到线程中执行，只取第一个结果
+            first_model = await asyncio.to_thread(lambda: next(iter(genai.list_models()), None))
+            return first_model is not None
         except Exception:
             return False
 
@@ -212,6 +210,9 @@ class MoonshotProvider(AIProvider):
 class AIManager:
     """AI管理器 - 仿照Cline的设计"""
     
+    # 单个供应商连接测试的超时时间（秒）
+    TEST_CONNECTION_TIMEOUT = 5
+    
     def __init__(self):
         self.providers = {
             'openai': OpenAIProvider(),
@@ -289,3 +290,21 @@ class AIManager:
         
         provider_instance = self.providers[provider]
         return await provider_instance.test_connection(api_key, base_url)
+    
+    async def test_all_connections(self, creds: Dict[str, Tuple[str, Optional[str]]]) -> Dict[str, bool]:
+        """并发测试多个AI供应商连接，超时或异常的供应商视为失败"""
+        providers = list(creds.keys())
+        results = await asyncio.gather(
+            *[
+                asyncio.wait_for(
+                    self.test_connection(provider, api_key, base_url),
+                    timeout=self.TEST_CONNECTION_TIMEOUT
+                )
+                for provider, (api_key, base_url) in creds.items()
+            ],
+            return_exceptions=True
+        )
+        return {
+            provider: result is True
+            for provider, result in zip(providers, results)
+        }
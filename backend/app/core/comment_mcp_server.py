@@ -3,9 +3,12 @@ import asyncio
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 import json
+import logging
 from app.core.ai_manager import AIManager
 from app.core.mcp_server import McpServer
 
+logger = logging.getLogger(__name__)
+
 class CommentMCPServer:
     """注释生成MCP服务器"""
     
@@ -69,17 +72,17 @@ class CommentMCPServer:
     async def generate_comments(self, file_path: str, comment_style: str = "detailed") -> Dict[str, Any]:
         """生成代码注释"""
         try:
-            print(f"[DEBUG] 开始生成注释，文件路径: {file_path}")
+            logger.debug("开始生成注释，文件路径: %s", file_path)
             
             # 读取文件内容
             content = await self.read_file(file_path)
-            print(f"[DEBUG] 文件读取成功，内容长度: {len(content)} 字符")
+            logger.debug("文件读取成功，内容长度: %d 字符", len(content))
             
             # 检测编程语言
             language = self.detect_language(file_path)
             if not language:
                 raise Exception("不支持的文件类型")
-            print(f"[DEBUG] 检测到编程语言: {language}")
+            logger.debug("检测到编程语言: %s", language)
             
             # 获取AI配置
             provider = os.getenv('AI_PROVIDER', 'openai')
@@ -93,7 +96,7 @@ class CommentMCPServer:
                     import json
                     # 配置文件路径：backend目录下的AI-Config.json
                     config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'AI-Config.json')
-                    print(f"[DEBUG] 尝试读取配置文件: {config_path}")
+                    logger.debug("尝试读取配置文件: %s", config_path)
                     
                     if os.path.exists(config_path):
                         with open(config_path, 'r', encoding='utf-8') as f:
@@ -101,21 +104,21 @@ class CommentMCPServer:
                             api_key = config.get('ai_api_key', '')
                             provider = config.get('ai_provider', provider)
                             model = config.get('ai_model', model)
-                        print(f"[DEBUG] 配置文件读取成功，provider: {provider}, model: {model}")
+                        logger.debug("配置文件读取成功，provider: %s, model: %s", provider, model)
                     else:
-                        print(f"[DEBUG] 配置文件不存在: {config_path}")
+                        logger.debug("配置文件不存在: %s", config_path)
                 except Exception as e:
-                    print(f"[DEBUG] 读取配置文件失败: {e}")
+                    logger.debug("读取配置文件失败: %s", e)
                     pass
                 
                 if not api_key:
                     raise Exception("请先配置AI API密钥")
             
-            print(f"[DEBUG] 使用AI配置 - Provider: {provider}, Model: {model}")
+            logger.debug("使用AI配置 - Provider: %s, Model: %s", provider, model)
             
             # 构建AI提示词
             prompt = self._build_prompt(content, language, comment_style)
-            print(f"[DEBUG] AI提示词构建完成，长度: {len(prompt)} 字符")
+            logger.debug("AI提示词构建完成，长度: %d 字符", len(prompt))
             
             messages = [
                 {"role": "system", "content": "你是一个专业的代码文档生成助手，专注于生成高质量的代码注释."},
@@ -123,7 +126,7 @@ class CommentMCPServer:
             ]
             
             # 调用AI生成注释
-            print(f"[DEBUG] 开始调用AI生成注释...")
+            logger.debug("开始调用AI生成注释...")
             response = await self.ai_manager.chat(
                 provider=provider,
                 model=model,
@@ -133,7 +136,7 @@ class CommentMCPServer:
                 max_tokens=4000
             )
             
-            print(f"[DEBUG] AI调用成功，响应长度: {len(response['content'])} 字符")
+            logger.debug("AI调用成功，响应长度: %d 字符", len(response['content']))
             
             commented_code = response["content"]
             
@@ -147,7 +150,7 @@ class CommentMCPServer:
             }
             
         except Exception as e:
-            print(f"[DEBUG] 生成注释时发生错误: {str(e)}")
+            logger.error("生成注释时发生错误: %s", e, exc_info=True)
             return {
                 "success": False,
                 "error": str(e),
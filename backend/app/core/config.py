@@ -24,6 +24,7 @@ class Settings(BaseSettings):
     
     # MCP settings
     mcp_servers_config_path: str = str(Path.home() / ".git-ai-core" / "mcp_servers.json")
+    mcp_max_file_bytes: int = 2 * 1024 * 1024  # read_project_file 返回内容的最大字节数，超出部分截断
     
     # Security settings
     encryption_key: Optional[str] = None
@@ -37,6 +38,7 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
-# Create necessary directories
-Path(settings.default_clone_path).mkdir(parents=True, exist_ok=True)
-Path(settings.mcp_servers_config_path).parent.mkdir(parents=True, exist_ok=True)
+def ensure_dirs():
+    """Create the directories the app writes into; called once at startup."""
+    Path(settings.default_clone_path).mkdir(parents=True, exist_ok=True)
+    Path(settings.mcp_servers_config_path).parent.mkdir(parents=True, exist_ok=True)
@@ -1,40 +1,145 @@
 import os
+import sys
+import stat
+import mmap
+import shutil
+import subprocess
+import threading
+import functools
 import git
+import charset_normalizer
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 import asyncio
+from collections import deque, OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 import json
-from datetime import datetime
+import time
+import itertools
+from datetime import datetime, timezone, timedelta
 import logging
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.project_mcp_server import _resolve_within
+from app.services.repository_service import RepositoryService, resolve_path
+
+try:
+    import pygit2
+except ImportError:  # pygit2 为可选依赖，缺失时回退到 GitPython
+    pygit2 = None
 
 logger = logging.getLogger(__name__)
 
+# 超过该大小的文件不缓存内容
+FILE_CACHE_MAX_FILE_SIZE = 1024 * 1024
+# 文件内容缓存的总字节预算
+FILE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# 流式读取文件时每块的大小
+FILE_STREAM_CHUNK_SIZE = 64 * 1024
+# 判断二进制文件时检查的开头字节数
+BINARY_SNIFF_BYTES = 4096
+
+def _read_text_file(full_path: str) -> Optional[str]:
+    """读取文本文件：通过 mmap 直接解码，避免额外的 bytes 拷贝；二进制文件返回 None"""
+    try:
+        with open(full_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # 开头出现 NUL 字节视为二进制文件
+                if mm.find(b'\0', 0, BINARY_SNIFF_BYTES) != -1:
+                    return None
+                
+                try:
+                    return str(mm, 'utf-8')
+                except UnicodeDecodeError:
+                    data = mm[:]
+    except (PermissionError, OSError, ValueError):
+        return None
+    
+    best = charset_normalizer.from_bytes(data).best()
+    return str(best) if best is not None else data.decode('latin1', errors='replace')
+
+# 文件内容LRU缓存: 路径 -> (mtime_ns, 大小, 内容)，按文件大小计入字节预算
+_file_cache: OrderedDict = OrderedDict()
+_file_cache_bytes = 0
+_file_cache_lock = threading.Lock()
+
+def _read_text_file_cached(full_path: str, mtime_ns: int, size: int) -> Optional[str]:
+    """按路径缓存文件内容，mtime 或大小变化后重新读取；总大小超过预算时淘汰最久未使用的条目"""
+    global _file_cache_bytes
+    with _file_cache_lock:
+        entry = _file_cache.get(full_path)
+        if entry is not None and entry[0] == mtime_ns and entry[1] == size:
+            _file_cache.move_to_end(full_path)
+            return entry[2]
+    
+    content = _read_text_file(full_path)
+    if content is None:
+        return None
+    
+    with _file_cache_lock:
+        old = _file_cache.pop(full_path, None)
+        if old is not None:
+            _file_cache_bytes -= old[1]
+        _file_cache[full_path] = (mtime_ns, size, content)
+        _file_cache_bytes += size
+        while _file_cache_bytes > FILE_CACHE_MAX_BYTES:
+            _, (_, evicted_size, _) = _file_cache.popitem(last=False)
+            _file_cache_bytes -= evicted_size
+    return content
+
+def _with_repo_lock(method):
+    """串行化同一项目上的 Git 调用：Repo 持有的常驻 cat-file 管道不是线程安全的"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._repo_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class GitProject:
     """Git项目封装类"""
     
     def __init__(self, path: str):
         self.path = Path(path)
         self.repo = None
+        # 只读热点路径使用的 libgit2 仓库句柄（可选）
+        self.repo2 = None
+        # GitPython 的持久 cat-file --batch 进程不是线程安全的，线程池与事件循环线程
+        # 访问同一个 Repo 时都需持有该锁（可重入，允许加锁方法相互调用）
+        self._repo_lock = threading.RLock()
+        # get_info 结果缓存，键为 (HEAD sha, 当前分支, 全部分支名)
+        self._info_cache: Optional[Tuple[tuple, Dict[str, Any]]] = None
         self._load_repo()
     
+    @_with_repo_lock
     def _load_repo(self):
         """加载Git仓库"""
+        self._info_cache = None
         try:
             self.repo = git.Repo(self.path)
         except git.InvalidGitRepositoryError:
             self.repo = None
+        
+        self.repo2 = None
+        if self.repo is not None and pygit2 is not None:
+            try:
+                self.repo2 = pygit2.Repository(str(self.path))
+            except Exception as e:
+                logger.debug(f"pygit2 unavailable for {self.path}: {e}")
     
+    @_with_repo_lock
     def close(self):
         """关闭Git资源，释放文件句柄"""
         if self.repo:
             try:
-                # 关闭git命令的管道
-                if hasattr(self.repo, 'git') and hasattr(self.repo.git, 'clear_cache'):
-                    self.repo.git.clear_cache()
+                # 关闭git命令的管道（包括常驻的 cat-file 进程）
+                self.repo.close()
+                if self.repo2 is not None:
+                    self.repo2.free()
                 # 释放repo对象
                 self.repo = None
+                self.repo2 = None
                 logger.debug(f"Closed Git resources for: {self.path}")
             except Exception as e:
                 logger.warning(f"Error closing Git resources: {e}")
@@ -43,26 +148,92 @@ class GitProject:
         """检查是否为有效的Git仓库"""
         return self.repo is not None
     
+    @_with_repo_lock
     def get_info(self) -> Dict[str, Any]:
         """获取项目基本信息"""
         if not self.is_valid():
             return {}
         
         try:
-            return {
+            head_commit = self.repo.head.commit
+            current_branch = self.repo.active_branch.name
+            branches = [branch.name for branch in self.repo.branches]
+            cache_key = (head_commit.hexsha, current_branch, tuple(sorted(branches)))
+            # HEAD 与分支列表未变化时提交数和最后提交信息都不会变化，直接复用缓存
+            if self._info_cache and self._info_cache[0] == cache_key:
+                return self._copy_info(self._info_cache[1])
+            
+            info = {
+                "path": str(self.path),
+                "name": self.path.name,
+                "remote_url": self.repo.remotes.origin.url if self.repo.remotes else None,
+                "current_branch": current_branch,
+                "branches": branches,
+                "commits_count": int(self.repo.git.rev_list('--count', 'HEAD')),
+                "last_commit": {
+                    "hash": str(head_commit.hexsha),
+                    "message": head_commit.message.strip(),
+                    "author": str(head_commit.author),
+                    "date": head_commit.committed_datetime.isoformat()
+                }
+            }
+            self._info_cache = (cache_key, info)
+            return self._copy_info(info)
+        except Exception as e:
+            return {"error": str(e)}
+    
+    @staticmethod
+    def _copy_info(info: Dict[str, Any]) -> Dict[str, Any]:
+        """复制缓存的项目信息，调用方修改返回值不会影响缓存"""
+        return {**info, "branches": list(info["branches"]), "last_commit": dict(info["last_commit"])}
+    
+    @_with_repo_lock
+    def _get_info_fast(self) -> Dict[str, Any]:
+        """批量获取项目信息：一次 for-each-ref 拿到全部分支与 HEAD，命中缓存时不再调用其他 git 命令"""
+        if not self.is_valid():
+            return {}
+        
+        try:
+            # 字段用 \x1f 分隔，避免分支名或提交信息中的 '|' 干扰解析
+            refs = self.repo.git.for_each_ref(
+                '--format=%(refname:short)%1f%(objectname)%1f%(HEAD)', 'refs/heads/'
+            )
+            branches = []
+            current_branch = None
+            head_sha = None
+            for line in refs.splitlines():
+                name, sha, head_marker = line.split('\x1f')
+                branches.append(name)
+                if head_marker == '*':
+                    current_branch, head_sha = name, sha
+            
+            if current_branch is None:
+                # 游离 HEAD 等情况交给 get_info 处理，保持原有错误返回
+                return self.get_info()
+            
+            cache_key = (head_sha, current_branch, tuple(sorted(branches)))
+            if self._info_cache and self._info_cache[0] == cache_key:
+                return self._copy_info(self._info_cache[1])
+            
+            last_commit = self.repo.git.log('-1', '--format=%H%x1f%an%x1f%cI%x1f%B')
+            commit_hash, author, date, message = last_commit.split('\x1f', 3)
+            
+            info = {
                 "path": str(self.path),
                 "name": self.path.name,
                 "remote_url": self.repo.remotes.origin.url if self.repo.remotes else None,
-                "current_branch": self.repo.active_branch.name,
-                "branches": [branch.name for branch in self.repo.branches],
-                "commits_count": len(list(self.repo.iter_commits())),
+                "current_branch": current_branch,
+                "branches": branches,
+                "commits_count": int(self.repo.git.rev_list('--count', 'HEAD')),
                 "last_commit": {
-                    "hash": str(self.repo.head.commit.hexsha),
-                    "message": self.repo.head.commit.message.strip(),
-                    "author": str(self.repo.head.commit.author),
-                    "date": self.repo.head.commit.committed_datetime.isoformat()
+                    "hash": commit_hash,
+                    "message": message.strip(),
+                    "author": author,
+                    "date": date
                 }
             }
+            self._info_cache = (cache_key, info)
+            return self._copy_info(info)
         except Exception as e:
             return {"error": str(e)}
     
@@ -71,63 +242,117 @@ class GitProject:
         if not self.is_valid():
             return {}
         
-        def build_tree(path: Path, depth: int = 0) -> Dict[str, Any]:
+        # 使用显式栈代替递归，避免深层目录触发递归限制
+        tree = {"type": "directory", "name": self.path.name}
+        stack = deque([(tree, str(self.path), 0)])
+        
+        while stack:
+            node, path, depth = stack.pop()
             if depth >= max_depth:
-                return {"type": "directory", "name": path.name}
+                continue
             
-            tree = {"type": "directory", "name": path.name, "children": []}
+            children = node["children"] = []
             
             try:
-                for item in sorted(path.iterdir()):
-                    if item.name.startswith('.') and item.name != '.git':
-                        continue
-                    
-                    if item.is_file():
-                        tree["children"].append({
+                # os.scandir 返回的 DirEntry 会缓存类型信息，避免每个条目多次 stat
+                with os.scandir(path) as it:
+                    entries = sorted(
+                        (entry for entry in it if not (entry.name.startswith('.') and entry.name != '.git')),
+                        key=lambda entry: entry.name
+                    )
+                
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        children.append({
                             "type": "file",
-                            "name": item.name,
-                            "size": item.stat().st_size,
-                            "extension": item.suffix
+                            "name": entry.name,
+                            "size": entry.stat(follow_symlinks=False).st_size,
+                            "extension": os.path.splitext(entry.name)[1]
                         })
-                    elif item.is_dir() and item.name != '.git':
-                        tree["children"].append(build_tree(item, depth + 1))
+                    elif entry.is_dir(follow_symlinks=False) and entry.name != '.git':
+                        sub = {"type": "directory", "name": entry.name}
+                        children.append(sub)
+                        stack.append((sub, entry.path, depth + 1))
             except PermissionError:
                 pass
-            
-            return tree
         
-        return build_tree(self.path)
+        return tree
+    
+    def _resolve_file(self, file_path: str) -> Optional[Path]:
+        """解析项目内的文件路径；../ 或绝对路径等逃出项目目录的请求返回 None"""
+        return _resolve_within(self.path.resolve(), file_path)
     
     def get_file_content(self, file_path: str) -> Optional[str]:
         """获取文件内容"""
         if not self.is_valid():
             return None
         
-        full_path = self.path / file_path
-        if not full_path.exists() or not full_path.is_file():
+        full_path = self._resolve_file(file_path)
+        if full_path is None:
+            return None
+        try:
+            st = full_path.stat()
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
             return None
         
+        # 大文件不进入缓存，避免占用过多内存
+        if st.st_size > FILE_CACHE_MAX_FILE_SIZE:
+            return _read_text_file(str(full_path))
+        return _read_text_file_cached(str(full_path), st.st_mtime_ns, st.st_size)
+    
+    def is_binary_file(self, file_path: str) -> bool:
+        """判断项目内文件是否为二进制文件（开头出现 NUL 字节），文件不存在或不可读时返回 False"""
+        if not self.is_valid():
+            return False
+        
+        full_path = self._resolve_file(file_path)
+        if full_path is None:
+            return False
         try:
-            # 尝试UTF-8编码
-            with open(full_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except UnicodeDecodeError:
-            # 尝试其他常见编码
-            for encoding in ['utf-8-sig', 'gbk', 'gb2312', 'cp1252', 'latin1']:
-                try:
-                    with open(full_path, 'r', encoding=encoding) as f:
-                        return f.read()
-                except UnicodeDecodeError:
-                    continue
+            with open(full_path, 'rb') as f:
+                return b'\0' in f.read(BINARY_SNIFF_BYTES)
+        except OSError:
+            return False
+    
+    def iter_file_chunks(self, file_path: str, chunk_size: int = FILE_STREAM_CHUNK_SIZE) -> Optional[Iterator[bytes]]:
+        """按块读取文件原始字节，供接口流式返回大文件；文件不存在时返回 None"""
+        if not self.is_valid():
+            return None
+        
+        full_path = self._resolve_file(file_path)
+        if full_path is None:
+            return None
+        try:
+            st = full_path.stat()
+        except OSError:
             return None
-        except (PermissionError, OSError):
+        if not stat.S_ISREG(st.st_mode):
             return None
+        
+        def generate() -> Iterator[bytes]:
+            with open(full_path, 'rb') as f:
+                if st.st_size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for offset in range(0, len(mm), chunk_size):
+                        yield mm[offset:offset + chunk_size]
+        
+        return generate()
     
+    @_with_repo_lock
     def get_recent_commits(self, limit: int = 10) -> List[Dict[str, Any]]:
         """获取最近的提交记录"""
         if not self.is_valid():
             return []
         
+        if self.repo2 is not None:
+            try:
+                return self._get_recent_commits_pygit2(limit)
+            except Exception as e:
+                logger.debug(f"pygit2 commit walk failed, falling back to GitPython: {e}")
+        
         commits = []
         try:
             for commit in self.repo.iter_commits(max_count=limit):
@@ -136,18 +361,25 @@ class GitProject:
                     "message": commit.message.strip(),
                     "author": str(commit.author),
                     "date": commit.committed_datetime.isoformat(),
-                    "files_changed": list(commit.stats.files.keys())
+                    "files_changed": self._changed_files(commit)
                 })
         except Exception:
             pass
         
         return commits
     
+    @_with_repo_lock
     def get_branches(self) -> List[Dict[str, Any]]:
         """获取所有分支信息"""
         if not self.is_valid():
             return []
         
+        if self.repo2 is not None:
+            try:
+                return self._get_branches_pygit2()
+            except Exception as e:
+                logger.debug(f"pygit2 branch listing failed, falling back to GitPython: {e}")
+        
         branches = []
         try:
             for branch in self.repo.branches:
@@ -162,6 +394,60 @@ class GitProject:
         
         return branches
     
+    def _changed_files(self, commit) -> List[str]:
+        """列出提交相对第一个父提交改动的文件名，只用一次 diff-tree 而不解析完整的 stats"""
+        if commit.parents:
+            output = self.repo.git.diff_tree(
+                '--no-commit-id', '--name-only', '-r', commit.parents[0].hexsha, commit.hexsha
+            )
+        else:
+            output = self.repo.git.diff_tree('--no-commit-id', '--name-only', '-r', '--root', commit.hexsha)
+        return output.splitlines()
+    
+    @staticmethod
+    def _pygit2_commit_date(commit) -> str:
+        """按提交者时区格式化 pygit2 提交时间，与 GitPython 的 committed_datetime 保持一致"""
+        tz = timezone(timedelta(minutes=commit.commit_time_offset))
+        return datetime.fromtimestamp(commit.commit_time, tz).isoformat()
+    
+    def _get_recent_commits_pygit2(self, limit: int) -> List[Dict[str, Any]]:
+        """使用 libgit2 遍历最近提交，避免逐个提交的子进程和解析开销"""
+        repo = self.repo2
+        walker = repo.walk(repo.head.target, pygit2.GIT_SORT_TIME)
+        
+        commits = []
+        for commit in itertools.islice(walker, limit):
+            if commit.parents:
+                diff = repo.diff(commit.parents[0], commit)
+            else:
+                diff = commit.tree.diff_to_tree(swap=True)
+            
+            commits.append({
+                "hash": str(commit.id),
+                "message": commit.message.strip(),
+                "author": commit.author.name,
+                "date": self._pygit2_commit_date(commit),
+                "files_changed": [delta.new_file.path for delta in diff.deltas]
+            })
+        
+        return commits
+    
+    def _get_branches_pygit2(self) -> List[Dict[str, Any]]:
+        """使用 libgit2 列出本地分支"""
+        branches = []
+        for name in self.repo2.branches.local:
+            branch = self.repo2.branches.local[name]
+            commit = branch.peel(pygit2.Commit)
+            branches.append({
+                "name": name,
+                "is_active": branch.is_head(),
+                "commit_hash": str(commit.id),
+                "commit_message": commit.message.strip()
+            })
+        
+        return branches
+    
+    @_with_repo_lock
     def get_diff(self, commit_hash: str = None) -> Optional[str]:
         """获取代码差异"""
         if not self.is_valid():
@@ -177,41 +463,92 @@ class GitProject:
         except Exception:
             return None
 
+def _handle_remove_readonly(func, path, exc):
+    """处理只读文件的删除"""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+def _rmtree(root: Path) -> None:
+    """删除目录树；shutil.rmtree 在 POSIX 上已基于目录 fd 删除，只读文件交给回调放开权限后重试"""
+    if sys.version_info >= (3, 12):
+        # Python 3.12 起 onerror 已弃用，改用 onexc
+        shutil.rmtree(root, onexc=_handle_remove_readonly)
+    else:
+        shutil.rmtree(root, onerror=_handle_remove_readonly)
+
 class GitManager:
     """Git管理器"""
     
+    # 同一项目两次 fetch 的最小间隔（秒），批量刷新时合并重复请求
+    FETCH_TTL = 60
+    
     def __init__(self):
         self.projects = {}
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        # 每个项目最近一次成功 fetch 的时间
+        self._last_fetch: Dict[str, float] = {}
+        # 规范化路径 -> 小写项目名，搜索时先按名称过滤再查询 git 信息
+        self._name_index: Dict[str, str] = {}
+        # git 操作主要阻塞在子进程/IO 上，线程数可以高于 CPU 核数
+        self.executor = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4))
     
     def add_project(self, path: str) -> bool:
         """添加项目到管理器"""
         project = GitProject(path)
         if project.is_valid():
-            self.projects[str(Path(path).resolve())] = project
+            resolved_path = resolve_path(path)
+            self.projects[resolved_path] = project
+            self._name_index[resolved_path] = project.path.name.lower()
             return True
         return False
     
     def remove_project(self, path: str) -> bool:
         """从管理器中移除项目"""
-        resolved_path = str(Path(path).resolve())
+        resolved_path = resolve_path(path)
         if resolved_path in self.projects:
             del self.projects[resolved_path]
+            self._name_index.pop(resolved_path, None)
             return True
         return False
     
     def get_project(self, path: str) -> Optional[GitProject]:
         """获取项目"""
-        resolved_path = str(Path(path).resolve())
+        resolved_path = resolve_path(path)
         return self.projects.get(resolved_path)
     
-    def list_projects(self) -> List[Dict[str, Any]]:
-        """列出所有项目"""
-        projects = []
-        for path, project in self.projects.items():
-            if project.is_valid():
-                projects.append(project.get_info())
-        return projects
+    async def list_projects(self) -> List[Dict[str, Any]]:
+        """列出所有项目（各项目的 git 查询在线程池中并行执行）"""
+        loop = asyncio.get_event_loop()
+        valid_projects = [project for project in self.projects.values() if project.is_valid()]
+        return await asyncio.gather(*[
+            loop.run_in_executor(self.executor, project._get_info_fast)
+            for project in valid_projects
+        ])
+    
+    async def _run_git(self, *args: str, cwd: Optional[str] = None) -> str:
+        """异步执行 git 命令，失败时抛出 GitCommandError"""
+        command = ['git', *args]
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=cwd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except NotImplementedError:
+            # Windows 上的 SelectorEventLoop 不支持子进程，回退到线程池执行
+            loop = asyncio.get_event_loop()
+            result = await loop.run_in_executor(
+                self.executor,
+                functools.partial(subprocess.run, command, cwd=cwd, capture_output=True)
+            )
+            returncode, stdout, stderr = result.returncode, result.stdout, result.stderr
+        else:
+            stdout, stderr = await proc.communicate()
+            returncode = proc.returncode
+        
+        if returncode != 0:
+            raise git.GitCommandError(command, returncode, stderr.decode('utf-8', errors='replace'))
+        return stdout.decode('utf-8', errors='replace')
     
     async def clone_repository(self, url: str, path: Optional[str] = None) -> Dict[str, Any]:
         """克隆Git仓库"""
@@ -231,56 +568,64 @@ class GitManager:
             if target_path.exists() and any(target_path.iterdir()):
                 return {"error": "Directory already exists and is not empty"}
             
-            # 异步克隆
-            loop = asyncio.get_event_loop()
-            repo = await loop.run_in_executor(
-                self.executor,
-                git.Repo.clone_from,
-                url,
-                str(target_path)
-            )
+            # 异步克隆：直接等待 git 子进程，不占用线程池
+            await self._run_git('clone', url, str(target_path))
             
             # 添加到管理器
             self.add_project(str(target_path))
             
             # 保存到数据库
             try:
-                from app.core.database import SessionLocal
-                from app.services.repository_service import RepositoryService
-                
-                db = SessionLocal()
-                repo_service = RepositoryService(db)
-                repo_service.add_repository(
-                    local_path=str(target_path),
-                    remote_url=repo.remotes.origin.url,
-                    name=repo_name
-                )
-                db.close()
+                with SessionLocal() as db:
+                    RepositoryService(db).add_repository(
+                        local_path=str(target_path),
+                        remote_url=url,
+                        name=repo_name
+                    )
             except Exception as db_error:
                 logger.warning(f"Failed to save repository to database: {db_error}")
             
             return {
                 "success": True,
                 "path": str(target_path),
-                "remote_url": repo.remotes.origin.url
+                "remote_url": url
             }
             
         except Exception as e:
             return {"error": str(e)}
     
+    async def clone_many(self, urls: List[str], path: Optional[str] = None, concurrency: int = 4) -> List[Dict[str, Any]]:
+        """并发克隆多个仓库，用信号量限制并发数以免触发托管平台限流"""
+        sem = asyncio.Semaphore(concurrency)
+        
+        async def clone_one(url: str) -> Dict[str, Any]:
+            async with sem:
+                return await self.clone_repository(url, path)
+        
+        results = await asyncio.gather(*(clone_one(url) for url in urls), return_exceptions=True)
+        return [
+            {"error": str(result)} if isinstance(result, Exception) else result
+            for result in results
+        ]
+    
     async def search_projects(self, query: str) -> List[Dict[str, Any]]:
         """搜索项目"""
-        results = []
-        for path, project in self.projects.items():
-            if project.is_valid():
-                info = project.get_info()
-                if query.lower() in info.get('name', '').lower():
-                    results.append(info)
-        return results
+        loop = asyncio.get_event_loop()
+        query_lower = query.lower()
+        # 先用名称索引筛选，只对匹配的项目执行 git 查询
+        matched_projects = [
+            project for path, project in self.projects.items()
+            if query_lower in self._name_index.get(path, '') and project.is_valid()
+        ]
+        infos = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, project.get_info)
+            for project in matched_projects
+        ])
+        return [info for info in infos if query_lower in info.get('name', '').lower()]
     
     def get_project_overview(self, path: str) -> Dict[str, Any]:
         """获取项目概览"""
-        resolved_path = str(Path(path).resolve())
+        resolved_path = resolve_path(path)
         project = self.get_project(resolved_path)
         if not project or not project.is_valid():
             return {"error": "Project not found or invalid"}
@@ -295,27 +640,24 @@ class GitManager:
     def load_repositories_from_database(self) -> int:
         """从数据库加载仓库路径"""
         try:
-            from app.core.database import SessionLocal
-            from app.services.repository_service import RepositoryService
-            
-            db = SessionLocal()
-            repo_service = RepositoryService(db)
-            
-            # 清理无效路径
-            cleaned = repo_service.cleanup_invalid_paths()
-            if cleaned > 0:
-                logger.info(f"Cleaned up {cleaned} invalid repository paths")
-            
-            # 加载有效路径
-            repositories = repo_service.get_all_repositories()
-            loaded_count = 0
-            
-            for repo in repositories:
-                if self.add_project(repo.local_path):
-                    loaded_count += 1
-                    logger.info(f"Loaded repository from database: {repo.local_path}")
+            # 整个加载过程复用同一个会话
+            with SessionLocal() as db:
+                repo_service = RepositoryService(db)
+                
+                # 清理无效路径
+                cleaned = repo_service.cleanup_invalid_paths()
+                if cleaned > 0:
+                    logger.info(f"Cleaned up {cleaned} invalid repository paths")
+                
+                # 加载有效路径
+                repositories = repo_service.get_all_repositories()
+                loaded_count = 0
+                
+                for repo in repositories:
+                    if self.add_project(repo.local_path):
+                        loaded_count += 1
+                        logger.info(f"Loaded repository from database: {repo.local_path}")
             
-            db.close()
             return loaded_count
             
         except Exception as e:
@@ -324,6 +666,10 @@ class GitManager:
 
     def _is_directory_locked(self, path: Path) -> tuple[bool, str]:
         """检查目录是否被锁定，返回(是否锁定, 锁定原因)"""
+        # 只有 Windows 会因文件被占用而锁定目录，POSIX 上无需写文件探测
+        if os.name != 'nt':
+            return False, ""
+        
         try:
             # 尝试创建一个临时文件来测试写入权限
             test_file = path / ".delete_test"
@@ -338,14 +684,12 @@ class GitManager:
     async def delete_project(self, path: str) -> Dict[str, Any]:
         """删除项目（数据库记录 + 本地文件）- 增强版"""
         try:
-            from app.core.database import SessionLocal
-            from app.services.repository_service import RepositoryService
             import gc
             
             logger.info(f"开始删除项目: {path}")
             
             # 规范化路径
-            resolved_path = str(Path(path).resolve())
+            resolved_path = resolve_path(path)
             logger.debug(f"规范化路径: {resolved_path}")
             
             # 检查项目是否存在
@@ -361,23 +705,21 @@ class GitManager:
             
             # 从管理器中移除
             del self.projects[resolved_path]
+            self._name_index.pop(resolved_path, None)
             logger.debug("已从内存管理器中移除")
             
-            # 强制垃圾回收，确保文件句柄释放
-            gc.collect()
-            logger.debug("已执行垃圾回收")
+            # Windows 上需要垃圾回收来确保文件句柄释放，其他平台依赖 close() 即可
+            if os.name == 'nt':
+                gc.collect(generation=2)
+                logger.debug("已执行垃圾回收")
             
             # 从数据库中移除
-            db = SessionLocal()
-            try:
-                repo_service = RepositoryService(db)
-                db_removed = repo_service.remove_repository(path)
+            with SessionLocal() as db:
+                db_removed = RepositoryService(db).remove_repository(path)
                 if db_removed:
                     logger.info("已从数据库中移除记录")
                 else:
                     logger.warning("数据库中未找到记录")
-            finally:
-                db.close()
             
             # 删除本地文件夹
             project_path = Path(path)
@@ -399,7 +741,6 @@ class GitManager:
                 }
             
             # 尝试删除文件夹
-            import shutil
             import time
             
             max_retries = 3
@@ -411,13 +752,7 @@ class GitManager:
                     if os.name == 'nt':
                         time.sleep(0.5)
                     
-                    def handle_remove_readonly(func, path, exc):
-                        """处理只读文件的删除"""
-                        import stat
-                        os.chmod(path, stat.S_IWRITE)
-                        func(path)
-                    
-                    shutil.rmtree(project_path, onerror=handle_remove_readonly)
+                    _rmtree(project_path)
                     logger.info(f"成功删除本地项目文件夹: {path}")
                     
                     return {
@@ -451,7 +786,7 @@ class GitManager:
     async def pull_updates(self, path: str) -> Dict[str, Any]:
         """从远程仓库强制拉取最新更新 - 增强版"""
         try:
-            resolved_path = str(Path(path).resolve())
+            resolved_path = resolve_path(path)
             project = self.get_project(resolved_path)
             
             if not project or not project.is_valid():
@@ -460,38 +795,23 @@ class GitManager:
             # 获取当前分支
             current_branch = project.repo.active_branch.name
             
-            loop = asyncio.get_event_loop()
+            cwd = str(project.path)
             
             # 先执行强制重置到远程最新状态
-            await loop.run_in_executor(
-                self.executor,
-                lambda: project.repo.git.execute(['git', 'fetch', 'origin'])
-            )
-            
-            await loop.run_in_executor(
-                self.executor,
-                lambda: project.repo.git.execute(['git', 'reset', '--hard', f'origin/{current_branch}'])
-            )
+            await self._run_git('fetch', 'origin', cwd=cwd)
+            await self._run_git('reset', '--hard', f'origin/{current_branch}', cwd=cwd)
             
             # 清理未跟踪文件
-            await loop.run_in_executor(
-                self.executor,
-                lambda: project.repo.git.execute(['git', 'clean', '-fd'])
-            )
+            await self._run_git('clean', '-fd', cwd=cwd)
             
             # 更新数据库中的最后更新时间
             try:
-                from app.core.database import SessionLocal
-                from app.services.repository_service import RepositoryService
-                
-                db = SessionLocal()
-                repo_service = RepositoryService(db)
-                repo_service.update_repository_last_updated(resolved_path)
-                db.close()
+                with SessionLocal() as db:
+                    RepositoryService(db).update_repository_last_updated(resolved_path)
             except Exception as db_error:
                 logger.warning(f"Failed to update database: {db_error}")
             
-            # 重新加载项目信息
+            # 重新加载项目信息（同时清空 get_info 缓存）
             project._load_repo()
             
             return {
@@ -505,37 +825,100 @@ class GitManager:
             logger.error(f"Failed to pull updates: {e}")
             return {"error": str(e)}
 
-    def get_project_status(self, path: str) -> Dict[str, Any]:
-        """获取项目状态（是否有更新等）"""
+    @staticmethod
+    def _build_project_status(repo: git.Repo) -> Dict[str, Any]:
+        """根据本地的远程跟踪分支计算项目状态（不触发网络请求）"""
+        local_commit = repo.head.commit
+        # 直接读取 refs/remotes/origin/<branch>，避免经由 origin.refs 的属性遍历
+        remote_commit = repo.refs[f'origin/{repo.active_branch.name}'].commit
+        
+        has_updates = local_commit.hexsha != remote_commit.hexsha
+        
+        # 检查工作区状态
+        is_clean = not repo.is_dirty()
+        
+        return {
+            "has_updates": has_updates,
+            "is_clean": is_clean,
+            "local_commit": str(local_commit.hexsha)[:8],
+            "remote_commit": str(remote_commit.hexsha)[:8],
+            "local_date": local_commit.committed_datetime.isoformat(),
+            "remote_date": remote_commit.committed_datetime.isoformat()
+        }
+    
+    @classmethod
+    def _project_status(cls, project: GitProject) -> Dict[str, Any]:
+        """持有项目的 Repo 锁计算状态，避免与线程池中的其他 Git 调用交错"""
+        with project._repo_lock:
+            return cls._build_project_status(project.repo)
+    
+    def _fetch_origin(self, path: str, project: GitProject) -> None:
+        """持有项目的 Repo 锁 fetch 远程仓库；在 FETCH_TTL 内已 fetch 过的项目直接跳过"""
+        last = self._last_fetch.get(path)
+        if last is not None and time.monotonic() - last < self.FETCH_TTL:
+            return
+        with project._repo_lock:
+            project.repo.remotes.origin.fetch()
+        self._last_fetch[path] = time.monotonic()
+    
+    async def pull_many(self, paths: List[str], concurrency: int = 4) -> List[Dict[str, Any]]:
+        """并发拉取多个项目的更新，用信号量限制并发数"""
+        sem = asyncio.Semaphore(concurrency)
+        
+        async def pull_one(path: str) -> Dict[str, Any]:
+            async with sem:
+                return await self.pull_updates(path)
+        
+        results = await asyncio.gather(*(pull_one(path) for path in paths), return_exceptions=True)
+        return [
+            {"error": str(result)} if isinstance(result, Exception) else result
+            for result in results
+        ]
+    
+    async def get_project_status(self, path: str, refresh: bool = False) -> Dict[str, Any]:
+        """获取项目状态（是否有更新等）
+        
+        默认只比较本地已缓存的远程跟踪分支；refresh=True 时才会访问网络 fetch。
+        Git 调用都在工作线程中执行，不阻塞事件循环。
+        """
         try:
-            resolved_path = str(Path(path).resolve())
+            resolved_path = resolve_path(path)
             project = self.get_project(resolved_path)
             if not project or not project.is_valid():
                 return {"error": "Project not found or invalid"}
             
-            repo = project.repo
+            if refresh:
+                await asyncio.to_thread(self._fetch_origin, resolved_path, project)
             
-            # 检查是否有更新
-            origin = repo.remotes.origin
-            origin.fetch()
-            
-            local_commit = repo.head.commit
-            remote_commit = origin.refs[repo.active_branch.name].commit
-            
-            has_updates = local_commit.hexsha != remote_commit.hexsha
-            
-            # 检查工作区状态
-            is_clean = not repo.is_dirty()
-            
-            return {
-                "has_updates": has_updates,
-                "is_clean": is_clean,
-                "local_commit": str(local_commit.hexsha)[:8],
-                "remote_commit": str(remote_commit.hexsha)[:8],
-                "local_date": local_commit.committed_datetime.isoformat(),
-                "remote_date": remote_commit.committed_datetime.isoformat()
-            }
+            return await asyncio.to_thread(self._project_status, project)
             
         except Exception as e:
             logger.error(f"Failed to get project status: {e}")
             return {"error": str(e)}
+    
+    def _fetch_and_build_status(self, path: str, project: GitProject) -> Dict[str, Any]:
+        """fetch 单个项目并计算状态，在线程池中执行"""
+        try:
+            self._fetch_origin(path, project)
+        except Exception as e:
+            logger.error(f"Failed to fetch {path}: {e}")
+            return {"error": str(e)}
+        try:
+            return self._project_status(project)
+        except Exception as e:
+            logger.error(f"Failed to get project status: {e}")
+            return {"error": str(e)}
+    
+    async def get_all_project_statuses(self) -> Dict[str, Dict[str, Any]]:
+        """并行 fetch 所有项目并计算状态，返回 {项目路径: 状态}；所有 Git 调用都在线程池中执行"""
+        loop = asyncio.get_event_loop()
+        valid_projects = {
+            path: project for path, project in self.projects.items()
+            if project.is_valid() and project.repo.remotes
+        }
+        
+        statuses = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, self._fetch_and_build_status, path, project)
+            for path, project in valid_projects.items()
+        ])
+        return dict(zip(valid_projects, statuses))
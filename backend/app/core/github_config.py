@@ -1,8 +1,20 @@
 import json
 import os
+import functools
 from pathlib import Path
 from typing import Optional, Dict
 
+import orjson
+
+@functools.lru_cache(maxsize=1)
+def _read_config_file(config_path: str, mtime_ns: int) -> Dict:
+    """按 (路径, mtime) 缓存解析结果，文件未修改时不再重复读取和解析"""
+    try:
+        with open(config_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except (orjson.JSONDecodeError, FileNotFoundError):
+        return {"access_token": ""}
+
 class GitHubConfig:
     def __init__(self):
         # 与AI配置同目录
@@ -10,13 +22,11 @@ class GitHubConfig:
         self.config = self._load_config()
 
     def _load_config(self) -> Dict:
-        if self.config_path.exists():
-            try:
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                return {"access_token": ""}
-        return {"access_token": ""}
+        try:
+            mtime_ns = self.config_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {"access_token": ""}
+        return _read_config_file(str(self.config_path), mtime_ns)
 
     def save_config(self, access_token: str) -> bool:
         config = {"access_token": access_token}
@@ -1,17 +1,179 @@
 import sqlite3
 import os
-import json
+import atexit
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional, Any
-from datetime import datetime
+from typing import List, Dict, Optional, Any, Iterable, Sequence, Tuple
+from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+from itertools import chain
 import logging
+import time
+
+import orjson
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时批量评分逐条计算
+    np = None
 
 logger = logging.getLogger(__name__)
 
+# 多行 VALUES 插入时每条语句最多包含的行数
+MULTI_ROW_INSERT_SIZE = 100
+# 旧版 SQLite 单条语句的参数上限（SQLITE_MAX_VARIABLE_NUMBER）
+SQLITE_MAX_VARIABLES = 999
+
+# SQL 语句集中定义为模块常量，配合连接的语句缓存复用已编译的语句
+SQL_INSERT_ACTIONS_PREFIX = '''
+INSERT INTO user_github_actions 
+(user_id, repo_full_name, action_type, search_query, duration_seconds)
+VALUES '''
+SQL_INSERT_ACTION = SQL_INSERT_ACTIONS_PREFIX + "(?, ?, ?, ?, ?)"
+
+SQL_INSERT_REPOS_PREFIX = '''
+INSERT OR REPLACE INTO cached_repo_features 
+(repo_full_name, language, stars, forks, open_issues, created_at, 
+ updated_at, topics, description, quality_score)
+VALUES '''
+SQL_INSERT_REPO = SQL_INSERT_REPOS_PREFIX + "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+SQL_SELECT_USER_ACTIONS = '''
+SELECT * FROM user_github_actions 
+WHERE user_id = ? 
+ORDER BY action_timestamp DESC 
+LIMIT ?
+'''
+
+SQL_SELECT_USER_REPO_STATS = '''
+SELECT repo_full_name, action_type, COUNT(*) AS n, COALESCE(SUM(duration_seconds), 0) AS dur
+FROM user_github_actions 
+WHERE user_id = ? AND action_timestamp > ?
+GROUP BY repo_full_name, action_type
+'''
+
+SQL_INSERT_RECOMMENDATION = '''
+INSERT INTO recommendation_history 
+(user_id, repo_full_name, recommendation_score, recommendation_type)
+VALUES (?, ?, ?, ?)
+'''
+
+SQL_MARK_RECOMMENDATION_CLICKED = '''
+UPDATE recommendation_history 
+SET clicked = TRUE, click_timestamp = CURRENT_TIMESTAMP
+WHERE id = ?
+'''
+
+SQL_SELECT_RECOMMENDATIONS = '''
+SELECT * FROM recommendation_history 
+WHERE user_id = ? 
+ORDER BY shown_timestamp DESC 
+LIMIT ?
+'''
+
+SQL_SELECT_CACHED_REPO = '''
+SELECT * FROM cached_repo_features 
+WHERE repo_full_name = ?
+'''
+
+SQL_SELECT_CACHED_REPOS_PREFIX = '''
+SELECT * FROM cached_repo_features 
+WHERE repo_full_name IN '''
+
+SQL_DELETE_OLD_ACTIONS = '''
+DELETE FROM user_github_actions 
+WHERE action_timestamp < ?
+'''
+
+SQL_DELETE_OLD_RECOMMENDATIONS = '''
+DELETE FROM recommendation_history 
+WHERE shown_timestamp < ?
+'''
+
+SQL_DELETE_STALE_REPOS = '''
+DELETE FROM cached_repo_features 
+WHERE last_crawled < ?
+'''
+
+REPO_FEATURES_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS {name} (
+    repo_full_name TEXT PRIMARY KEY,
+    language TEXT,
+    stars INTEGER,
+    forks INTEGER,
+    open_issues INTEGER,
+    created_at DATETIME,
+    updated_at DATETIME,
+    topics TEXT,
+    description TEXT,
+    quality_score FLOAT DEFAULT 0,
+    last_crawled DATETIME DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID
+'''
+
+def _insert_rows(conn: sqlite3.Connection, insert_sql: str, rows: List[Tuple], width: int):
+    """以多行 VALUES (?,..),(?,..) 形式批量插入，减少语句执行次数"""
+    per_statement = max(1, min(MULTI_ROW_INSERT_SIZE, SQLITE_MAX_VARIABLES // width))
+    placeholder = "(" + ",".join(["?"] * width) + ")"
+    full = len(rows) - len(rows) % per_statement
+    if full:
+        # 满批的语句文本相同，交给 executemany 复用同一预编译语句
+        conn.executemany(
+            insert_sql + ",".join([placeholder] * per_statement),
+            (tuple(chain.from_iterable(rows[start:start + per_statement]))
+             for start in range(0, full, per_statement))
+        )
+    rest = rows[full:]
+    if rest:
+        conn.execute(insert_sql + ",".join([placeholder] * len(rest)), tuple(chain.from_iterable(rest)))
+
+# 最近一次查询的 (cursor.description, 列名元组)；同一条语句的所有行共享同一个 description 对象
+_last_columns: tuple = (None, ())
+
+def _dict_row(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    """row_factory：直接把查询结果构造成 dict，省去 sqlite3.Row 中间对象；列名按语句只提取一次"""
+    global _last_columns
+    description = cursor.description
+    cached_description, columns = _last_columns
+    if cached_description is not description:
+        columns = tuple(column[0] for column in description)
+        # 整体替换元组，其他线程读到的总是一致的一对值
+        _last_columns = (description, columns)
+    return dict(zip(columns, row))
+
+def _utc_cutoff(days: int) -> str:
+    """返回 days 天前的 UTC 时间字符串，格式与 CURRENT_TIMESTAMP 写入的值一致"""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+@lru_cache(maxsize=4096)
+def _parse_iso_datetime(value: str) -> datetime:
+    """解析 ISO 时间字符串并缓存结果，不带时区的时间按本地时间处理"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.astimezone()
+
+def _timestamp_or_nan(value: Optional[str]) -> float:
+    """将 ISO 时间字符串转换为 Unix 时间戳，无法解析时返回 NaN"""
+    if not value:
+        return float('nan')
+    try:
+        return _parse_iso_datetime(value).timestamp()
+    except (ValueError, TypeError, AttributeError):
+        return float('nan')
+
 class GitHubRecommendationDB:
     def __init__(self):
         # 数据库文件路径
         self.db_path = Path(__file__).parent.parent / "data" / "github_recommendations.db"
+        # db_path 是 Path 对象，需按字符串判断是否为内存数据库
+        self._in_memory = str(self.db_path) == ':memory:'
+        # 每个线程复用一个读连接；写入统一走单一写连接并由锁串行化（WAL 允许一写多读）
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        atexit.register(self._close_all)
         self._ensure_db_directory()
         self._init_database()
 
@@ -27,149 +189,246 @@ class GitHubRecommendationDB:
     def _init_database(self):
         """初始化数据库表结构"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-
-            # 创建用户行为记录表
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_github_actions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL DEFAULT 'default',
-                repo_full_name TEXT NOT NULL,
-                action_type TEXT NOT NULL CHECK(action_type IN ('view', 'star', 'clone', 'search')),
-                search_query TEXT,
-                action_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                duration_seconds INTEGER
-            )
-            ''')
-
-            # 创建项目特征缓存表
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cached_repo_features (
-                repo_full_name TEXT PRIMARY KEY,
-                language TEXT,
-                stars INTEGER,
-                forks INTEGER,
-                open_issues INTEGER,
-                created_at DATETIME,
-                updated_at DATETIME,
-                topics TEXT,
-                description TEXT,
-                quality_score FLOAT DEFAULT 0,
-                last_crawled DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-
-            # 创建推荐历史表
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS recommendation_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL DEFAULT 'default',
-                repo_full_name TEXT NOT NULL,
-                recommendation_score FLOAT NOT NULL,
-                recommendation_type TEXT NOT NULL CHECK(recommendation_type IN ('trending', 'personalized', 'similar', 'explore')),
-                shown_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                clicked BOOLEAN DEFAULT FALSE,
-                click_timestamp DATETIME
-            )
-            ''')
-
-            # 创建索引以提高查询性能
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_actions_user_id ON user_github_actions(user_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_actions_repo ON user_github_actions(repo_full_name)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_actions_timestamp ON user_github_actions(action_timestamp)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_recommendation_user ON recommendation_history(user_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_recommendation_timestamp ON recommendation_history(shown_timestamp)')
+            # WAL 模式允许读写并发并减少 fsync，设置后持久保存在数据库文件中
+            if not self._in_memory:
+                with self._write_lock:
+                    mode = self._get_write_connection().execute('PRAGMA journal_mode=WAL').fetchone()[0]
+                if mode.lower() != 'wal':
+                    logger.warning(f"数据库未能切换到 WAL 模式，当前为: {mode}")
 
-            conn.commit()
+            with self._writing() as conn:
+                self._create_schema(conn.cursor())
             logger.info("GitHub推荐数据库初始化成功")
             
         except Exception as e:
             logger.error(f"数据库初始化失败: {e}")
             raise
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
-    def _get_connection(self):
-        """获取数据库连接"""
+    def _create_schema(self, cursor: sqlite3.Cursor):
+        """创建表结构与索引"""
+        # 创建用户行为记录表
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_github_actions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            repo_full_name TEXT NOT NULL,
+            action_type TEXT NOT NULL CHECK(action_type IN ('view', 'star', 'clone', 'search')),
+            search_query TEXT,
+            action_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            duration_seconds INTEGER
+        )
+        ''')
+
+        # 创建项目特征缓存表（WITHOUT ROWID：按主键聚簇存储，查询只需一次 B 树查找）
+        self._migrate_repo_features_without_rowid(cursor)
+        cursor.execute(REPO_FEATURES_TABLE_SQL.format(name='cached_repo_features'))
+
+        # 创建推荐历史表
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recommendation_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            repo_full_name TEXT NOT NULL,
+            recommendation_score FLOAT NOT NULL,
+            recommendation_type TEXT NOT NULL CHECK(recommendation_type IN ('trending', 'personalized', 'similar', 'explore')),
+            shown_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            clicked BOOLEAN DEFAULT FALSE,
+            click_timestamp DATETIME
+        )
+        ''')
+
+        # 创建索引以提高查询性能
+        # (user_id, 时间倒序) 复合索引可直接满足按用户查询最近记录，无需额外排序
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_actions_user_ts ON user_github_actions(user_id, action_timestamp DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_actions_repo ON user_github_actions(repo_full_name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_actions_timestamp ON user_github_actions(action_timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reco_user_ts ON recommendation_history(user_id, shown_timestamp DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_recommendation_timestamp ON recommendation_history(shown_timestamp)')
+        # 单列 user_id 索引已被复合索引覆盖
+        cursor.execute('DROP INDEX IF EXISTS idx_user_actions_user_id')
+        cursor.execute('DROP INDEX IF EXISTS idx_recommendation_user')
+
+    def _migrate_repo_features_without_rowid(self, cursor: sqlite3.Cursor):
+        """将旧版（带 rowid）的 cached_repo_features 表一次性重建为 WITHOUT ROWID 表"""
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'cached_repo_features'"
+        )
+        row = cursor.fetchone()
+        if not row or 'WITHOUT ROWID' in row[0].upper():
+            return
+
+        logger.info("迁移 cached_repo_features 表为 WITHOUT ROWID")
+        columns = ", ".join(info[1] for info in cursor.execute("PRAGMA table_info(cached_repo_features)").fetchall())
+        cursor.execute("DROP TABLE IF EXISTS cached_repo_features_new")
+        cursor.execute(REPO_FEATURES_TABLE_SQL.format(name='cached_repo_features_new'))
+        # 旧表的 TEXT 主键允许 NULL，WITHOUT ROWID 表不允许，需过滤掉
+        cursor.execute(f'''
+        INSERT INTO cached_repo_features_new ({columns})
+        SELECT {columns} FROM cached_repo_features WHERE repo_full_name IS NOT NULL
+        ''')
+        cursor.execute("DROP TABLE cached_repo_features")
+        cursor.execute("ALTER TABLE cached_repo_features_new RENAME TO cached_repo_features")
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建新的数据库连接并应用连接级 PRAGMA"""
         try:
             conn = sqlite3.connect(
                 str(self.db_path),
                 timeout=30,
-                check_same_thread=False
+                check_same_thread=False,
+                cached_statements=256
             )
             # 启用外键支持
             conn.execute("PRAGMA foreign_keys = ON")
+            # WAL 下 NORMAL 同步级别已足够安全，且每次提交少一次 fsync
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            conn.execute("PRAGMA mmap_size = 268435456")
+            conn.execute("PRAGMA cache_size = -20000")
+            conn.execute("PRAGMA busy_timeout = 30000")
+            with self._connections_lock:
+                self._connections.append(conn)
             return conn
         except Exception as e:
             logger.error(f"获取数据库连接失败: {e}")
             raise
 
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的读连接（惰性创建并复用），查询结果为 dict"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = _dict_row
+            self._local.conn = conn
+        return conn
+
+    def _get_write_connection(self) -> sqlite3.Connection:
+        """获取共享的写连接，调用方需持有 self._write_lock"""
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    @contextmanager
+    def _writing(self):
+        """在写锁内获取写连接，退出时由 with conn 提交或回滚"""
+        with self._write_lock:
+            conn = self._get_write_connection()
+            with conn:
+                yield conn
+
+    def _close_all(self):
+        """关闭所有已创建的连接（进程退出时调用）"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._writer = None
+        self._local = threading.local()
+
     def record_user_action(self, user_id: str, repo_full_name: str, action_type: str, 
                           search_query: str = None, duration_seconds: int = None) -> bool:
         """记录用户行为"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            INSERT INTO user_github_actions 
-            (user_id, repo_full_name, action_type, search_query, duration_seconds)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, repo_full_name, action_type, search_query, duration_seconds))
-            
-            conn.commit()
+            with self._writing() as conn:
+                conn.execute(SQL_INSERT_ACTION, (user_id, repo_full_name, action_type, search_query, duration_seconds))
+
             logger.debug(f"记录用户行为成功: {user_id}, {repo_full_name}, {action_type}")
             return True
             
         except Exception as e:
             logger.error(f"记录用户行为失败: {e}")
             return False
-        finally:
-            if 'conn' in locals():
-                conn.close()
+
+    def record_user_actions_bulk(self, rows: Iterable[Sequence[Any]]) -> bool:
+        """批量记录用户行为，rows 中每项为 (user_id, repo_full_name, action_type, search_query, duration_seconds)"""
+        rows = [tuple(row) for row in rows]
+        if not rows:
+            return True
+        try:
+            with self._writing() as conn:
+                _insert_rows(conn, SQL_INSERT_ACTIONS_PREFIX, rows, 5)
+
+            logger.debug(f"批量记录用户行为成功: {len(rows)} 条")
+            return True
+            
+        except Exception as e:
+            logger.error(f"批量记录用户行为失败: {e}")
+            return False
+
+    def _repo_feature_row(self, repo_data: Dict[str, Any], quality_score: Optional[float] = None) -> Tuple:
+        """将项目数据转换为 cached_repo_features 的一行"""
+        # 处理topics数组
+        topics_json = orjson.dumps(repo_data['topics']).decode('utf-8') if repo_data.get('topics') else None
+        if quality_score is None:
+            quality_score = self._calculate_quality_score(repo_data)
+        return (
+            repo_data['full_name'],
+            repo_data.get('language'),
+            repo_data.get('stargazers_count', 0),
+            repo_data.get('forks_count', 0),
+            repo_data.get('open_issues_count', 0),
+            repo_data.get('created_at'),
+            repo_data.get('updated_at'),
+            topics_json,
+            repo_data.get('description'),
+            quality_score
+        )
 
     def cache_repo_features(self, repo_data: Dict[str, Any]) -> bool:
         """缓存项目特征"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 处理topics数组
-            topics_json = json.dumps(repo_data.get('topics', [])) if repo_data.get('topics') else None
-            
-            cursor.execute('''
-            INSERT OR REPLACE INTO cached_repo_features 
-            (repo_full_name, language, stars, forks, open_issues, created_at, 
-             updated_at, topics, description, quality_score)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                repo_data['full_name'],
-                repo_data.get('language'),
-                repo_data.get('stargazers_count', 0),
-                repo_data.get('forks_count', 0),
-                repo_data.get('open_issues_count', 0),
-                repo_data.get('created_at'),
-                repo_data.get('updated_at'),
-                topics_json,
-                repo_data.get('description'),
-                self._calculate_quality_score(repo_data)
-            ))
-            
-            conn.commit()
+            with self._writing() as conn:
+                conn.execute(SQL_INSERT_REPO, self._repo_feature_row(repo_data))
+
             logger.debug(f"缓存项目特征成功: {repo_data['full_name']}")
             return True
             
         except Exception as e:
             logger.error(f"缓存项目特征失败: {e}")
             return False
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
-    def _calculate_quality_score(self, repo_data: Dict[str, Any]) -> float:
-        """计算项目质量评分"""
+    def cache_repo_features_bulk(self, repos: Iterable[Dict[str, Any]]) -> bool:
+        """批量缓存项目特征，所有行在同一事务中写入"""
+        repos = list(repos)
+        scores = self._calculate_quality_scores(repos)
+        rows = [self._repo_feature_row(repo_data, score) for repo_data, score in zip(repos, scores)]
+        if not rows:
+            return True
+        try:
+            with self._writing() as conn:
+                _insert_rows(conn, SQL_INSERT_REPOS_PREFIX, rows, 10)
+
+            logger.debug(f"批量缓存项目特征成功: {len(rows)} 个")
+            return True
+            
+        except Exception as e:
+            logger.error(f"批量缓存项目特征失败: {e}")
+            return False
+
+    def record_search_results(self, user_id: str, search_query: str, repos: List[Dict[str, Any]]) -> bool:
+        """记录一次搜索：搜索行为和结果项目特征在同一事务中批量写入，只提交一次"""
+        if not repos:
+            return True
+        scores = self._calculate_quality_scores(repos)
+        repo_rows = [self._repo_feature_row(repo_data, score) for repo_data, score in zip(repos, scores)]
+        action_rows = [(user_id, repo_data['full_name'], 'search', search_query, None) for repo_data in repos]
+        try:
+            with self._writing() as conn:
+                _insert_rows(conn, SQL_INSERT_ACTIONS_PREFIX, action_rows, 5)
+                _insert_rows(conn, SQL_INSERT_REPOS_PREFIX, repo_rows, 10)
+
+            logger.debug(f"记录搜索结果成功: {len(repos)} 个项目")
+            return True
+            
+        except Exception as e:
+            logger.error(f"记录搜索结果失败: {e}")
+            return False
+
+    def _calculate_quality_score(self, repo_data: Dict[str, Any], now: Optional[datetime] = None) -> float:
+        """计算项目质量评分，批量调用时可传入统一的 now 避免重复取当前时间"""
         score = 0.0
         
         # 星标数权重
@@ -177,10 +436,12 @@ class GitHubRecommendationDB:
         score += min(stars / 1000, 10.0) * 0.4  # 最多10分，权重40%
         
         # 更新活跃度权重
+        # 两侧均为带时区时间；早先用 naive 的 datetime.now() 与带时区的 updated_at 相减，
+        # TypeError 被下方 except 吞掉，这一项实际从未计分
         if repo_data.get('updated_at'):
             try:
-                updated_at = datetime.fromisoformat(repo_data['updated_at'].replace('Z', '+00:00'))
-                days_since_update = (datetime.now() - updated_at).days
+                updated_at = _parse_iso_datetime(repo_data['updated_at'])
+                days_since_update = ((now or datetime.now(timezone.utc)) - updated_at).days
                 recency_score = max(0, 10 - (days_since_update / 30))  # 30天内10分，每过30天减1分
                 score += recency_score * 0.3  # 权重30%
             except:
@@ -197,159 +458,141 @@ class GitHubRecommendationDB:
         
         return round(score, 2)
 
+    def _calculate_quality_scores(self, repos: List[Dict[str, Any]]) -> List[float]:
+        """批量计算项目质量评分，有 numpy 时向量化计算，结果与 _calculate_quality_score 一致"""
+        if np is None or not repos:
+            now = datetime.now(timezone.utc)
+            return [self._calculate_quality_score(repo_data, now) for repo_data in repos]
+
+        stars = np.fromiter((r.get('stargazers_count') or 0 for r in repos), dtype=np.float64, count=len(repos))
+        forks = np.fromiter((r.get('forks_count') or 0 for r in repos), dtype=np.float64, count=len(repos))
+        issues = np.fromiter((r.get('open_issues_count') or 0 for r in repos), dtype=np.float64, count=len(repos))
+        updated = np.fromiter((_timestamp_or_nan(r.get('updated_at')) for r in repos), dtype=np.float64, count=len(repos))
+
+        days_since_update = np.floor((time.time() - updated) / 86400)
+        recency = np.where(np.isnan(updated), 0.0, np.maximum(0, 10 - days_since_update / 30))
+
+        scores = (
+            np.minimum(stars / 1000, 10.0) * 0.4
+            + recency * 0.3
+            + np.minimum(forks / 100, 5.0) * 0.2
+            + np.maximum(0, 5 - issues / 20) * 0.1
+        )
+        return [round(score, 2) for score in scores.tolist()]
+
     def get_user_actions(self, user_id: str, limit: int = 100) -> List[Dict]:
         """获取用户行为历史"""
         try:
-            conn = self._get_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            SELECT * FROM user_github_actions 
-            WHERE user_id = ? 
-            ORDER BY action_timestamp DESC 
-            LIMIT ?
-            ''', (user_id, limit))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            return self._get_connection().execute(SQL_SELECT_USER_ACTIONS, (user_id, limit)).fetchall()
             
         except Exception as e:
             logger.error(f"获取用户行为失败: {e}")
             return []
-        finally:
-            if 'conn' in locals():
-                conn.close()
+
+    def get_user_repo_stats(self, user_id: str, since_days: int = 90) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """按项目和行为类型聚合用户行为，返回 {repo: {action_type: {"count": 次数, "duration": 总时长}}}"""
+        try:
+            rows = self._get_connection().execute(
+                SQL_SELECT_USER_REPO_STATS, (user_id, _utc_cutoff(since_days))
+            ).fetchall()
+            
+            stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+            for row in rows:
+                stats.setdefault(row['repo_full_name'], {})[row['action_type']] = {"count": row['n'], "duration": row['dur']}
+            return stats
+            
+        except Exception as e:
+            logger.error(f"获取用户行为统计失败: {e}")
+            return {}
 
     def record_recommendation(self, user_id: str, repo_full_name: str, 
                             score: float, rec_type: str) -> bool:
         """记录推荐历史"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            INSERT INTO recommendation_history 
-            (user_id, repo_full_name, recommendation_score, recommendation_type)
-            VALUES (?, ?, ?, ?)
-            ''', (user_id, repo_full_name, score, rec_type))
-            
-            conn.commit()
+            with self._writing() as conn:
+                conn.execute(SQL_INSERT_RECOMMENDATION, (user_id, repo_full_name, score, rec_type))
+
             return True
             
         except Exception as e:
             logger.error(f"记录推荐历史失败: {e}")
             return False
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
     def mark_recommendation_clicked(self, recommendation_id: int) -> bool:
         """标记推荐为已点击"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            UPDATE recommendation_history 
-            SET clicked = TRUE, click_timestamp = CURRENT_TIMESTAMP
-            WHERE id = ?
-            ''', (recommendation_id,))
-            
-            conn.commit()
+            with self._writing() as conn:
+                cursor = conn.execute(SQL_MARK_RECOMMENDATION_CLICKED, (recommendation_id,))
+
             return cursor.rowcount > 0
             
         except Exception as e:
             logger.error(f"标记推荐点击失败: {e}")
             return False
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
     def get_recommendation_history(self, user_id: str, limit: int = 50) -> List[Dict]:
         """获取推荐历史"""
         try:
-            conn = self._get_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            SELECT * FROM recommendation_history 
-            WHERE user_id = ? 
-            ORDER BY shown_timestamp DESC 
-            LIMIT ?
-            ''', (user_id, limit))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            return self._get_connection().execute(SQL_SELECT_RECOMMENDATIONS, (user_id, limit)).fetchall()
             
         except Exception as e:
             logger.error(f"获取推荐历史失败: {e}")
             return []
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
     def get_cached_repo(self, repo_full_name: str) -> Optional[Dict]:
         """获取缓存的项目信息"""
         try:
-            conn = self._get_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            SELECT * FROM cached_repo_features 
-            WHERE repo_full_name = ?
-            ''', (repo_full_name,))
-            
-            row = cursor.fetchone()
-            if row:
-                result = dict(row)
+            result = self._get_connection().execute(SQL_SELECT_CACHED_REPO, (repo_full_name,)).fetchone()
+            if result:
                 # 解析topics JSON
                 if result.get('topics'):
-                    result['topics'] = json.loads(result['topics'])
+                    result['topics'] = orjson.loads(result['topics'])
                 return result
             return None
             
         except Exception as e:
             logger.error(f"获取缓存项目失败: {e}")
             return None
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
-    def cleanup_old_data(self, days_to_keep: int = 90):
-        """清理过期数据"""
+    def get_cached_repos_bulk(self, repo_full_names: Iterable[str]) -> Dict[str, Dict]:
+        """批量获取缓存的项目信息，以 IN 查询代替逐个查询，返回 {repo_full_name: 项目信息}"""
+        names = list(dict.fromkeys(repo_full_names))
+        cached = {}
         try:
             conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # 清理旧的行为记录
-            cursor.execute('''
-            DELETE FROM user_github_actions 
-            WHERE action_timestamp < datetime('now', ?)
-            ''', (f'-{days_to_keep} days',))
-            
-            # 清理旧的推荐历史
-            cursor.execute('''
-            DELETE FROM recommendation_history 
-            WHERE shown_timestamp < datetime('now', ?)
-            ''', (f'-{days_to_keep} days',))
-            
-            # 清理长时间未更新的缓存项目
-            cursor.execute('''
-            DELETE FROM cached_repo_features 
-            WHERE last_crawled < datetime('now', ?)
-            ''', (f'-{days_to_keep * 2} days',))
+            for start in range(0, len(names), SQLITE_MAX_VARIABLES):
+                chunk = names[start:start + SQLITE_MAX_VARIABLES]
+                sql = SQL_SELECT_CACHED_REPOS_PREFIX + "(" + ",".join(["?"] * len(chunk)) + ")"
+                for result in conn.execute(sql, chunk):
+                    if result.get('topics'):
+                        result['topics'] = orjson.loads(result['topics'])
+                    cached[result['repo_full_name']] = result
+            return cached
             
-            conn.commit()
-            logger.info(f"清理了 {cursor.rowcount} 条过期数据")
+        except Exception as e:
+            logger.error(f"批量获取缓存项目失败: {e}")
+            return cached
+
+    def cleanup_old_data(self, days_to_keep: int = 90):
+        """清理过期数据"""
+        # 截止时间在 Python 中计算一次并作为参数绑定
+        cutoff = _utc_cutoff(days_to_keep)
+        repo_cutoff = _utc_cutoff(days_to_keep * 2)
+        try:
+            with self._writing() as conn:
+                # 三条删除放在同一个事务中，开始时即获取写锁
+                conn.execute("BEGIN IMMEDIATE")
+                # 清理旧的行为记录
+                deleted = conn.execute(SQL_DELETE_OLD_ACTIONS, (cutoff,)).rowcount
+                # 清理旧的推荐历史
+                deleted += conn.execute(SQL_DELETE_OLD_RECOMMENDATIONS, (cutoff,)).rowcount
+                # 清理长时间未更新的缓存项目
+                deleted += conn.execute(SQL_DELETE_STALE_REPOS, (repo_cutoff,)).rowcount
+
+            logger.info(f"清理了 {deleted} 条过期数据")
             
         except Exception as e:
             logger.error(f"数据清理失败: {e}")
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
 # 全局数据库实例
 github_recommendation_db = GitHubRecommendationDB()
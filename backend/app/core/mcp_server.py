@@ -1,8 +1,10 @@
 from typing import Dict, Any, Optional, List
-import json
 import os
 import asyncio
 from pathlib import Path
+
+import orjson
+
 from app.core.config import settings
 
 class McpServer:
@@ -11,6 +13,8 @@ class McpServer:
     def __init__(self):
         self.servers = {}
         self.config_path = settings.mcp_servers_config_path
+        # 最近一次写入（或读取）的配置文件内容，内容未变化时跳过写盘
+        self._last_serialized: Optional[bytes] = None
         self._load_servers()
     
     def _load_servers(self):
@@ -20,8 +24,10 @@ class McpServer:
             return
         
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                self.servers = json.load(f)
+            with open(self.config_path, 'rb') as f:
+                data = f.read()
+            self.servers = orjson.loads(data)
+            self._last_serialized = data
         except Exception as e:
             print(f"Error loading MCP servers: {e}")
             self.servers = {}
@@ -29,9 +35,19 @@ class McpServer:
     def _save_servers(self):
         """保存MCP服务器配置"""
         try:
+            data = orjson.dumps(self.servers, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            if data == self._last_serialized:
+                return
+            
             os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.servers, f, indent=2, ensure_ascii=False)
+            # 先写临时文件并落盘，再原子替换，避免写入中途崩溃导致配置损坏
+            tmp_path = self.config_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_path)
+            self._last_serialized = data
         except Exception as e:
             print(f"Error saving MCP servers: {e}")
     
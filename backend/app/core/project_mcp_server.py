@@ -1,79 +1,254 @@
 import os
-from typing import Dict, Any, List, Optional
+import stat
+import asyncio
+import time
+import codecs
+import mmap
+from typing import Dict, Any, List, Optional, Tuple
+from functools import lru_cache
 from pathlib import Path
 import json
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.repository import Repository
+from app.core.config import settings
+
+# read_project_file 最多返回的字节数，超出部分截断
+MAX_FILE_BYTES = settings.mcp_max_file_bytes
+# 目录扫描结果缓存的最长有效期（秒），用于兜底深层目录变化
+LIST_CACHE_TTL = 30
+
+# 扫描时忽略的常见目录
+IGNORED_DIRS = frozenset({
+    '.git', '__pycache__', 'node_modules', 'dist', 'build', '.vscode', '.idea', '.venv', 'venv', 'env'
+})
+
+def _read_text_head(fd: int, limit: int) -> str:
+    """通过 mmap 只解码文件前 limit 字节，丢弃被截断的不完整 UTF-8 字符"""
+    with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        return decoder.decode(mm[:limit], final=False)
+
+def _file_extension(name: str) -> str:
+    """返回小写扩展名，语义与 Path(name).suffix 相同，但不构造 Path 对象"""
+    dot = name.rfind('.')
+    if 0 < dot < len(name) - 1:
+        return name[dot:].lower()
+    return ''
+
+@lru_cache(maxsize=128)
+def _scan_project_files(abs_base_path: str, directory: str, max_depth: int,
+                        supported_extensions: frozenset, dir_mtime_ns: int, ttl_bucket: int) -> Tuple[tuple, int, int]:
+    """扫描目录并返回 (条目, 文件数, 目录数)；dir_mtime_ns 与 ttl_bucket 仅作为缓存键"""
+    result = []
+    total_files = 0
+    total_dirs = 0
+
+    def on_walk_error(e: OSError):
+        # 忽略权限错误，其余错误记录后继续扫描
+        if not isinstance(e, PermissionError):
+            print(f"扫描目录错误 {e.filename}: {e}")
+
+    # os.walk 自上而下遍历，通过原地修改 dirs 剪枝忽略目录和超出深度的子树
+    for root, dirs, files in os.walk(abs_base_path, onerror=on_walk_error):
+        sub_path = root[len(abs_base_path):].lstrip(os.sep)
+        depth = sub_path.count(os.sep) + 1 if sub_path else 0
+        if depth > max_depth:
+            dirs[:] = []
+            continue
+
+        current_relative = os.path.join(directory, sub_path) if directory else sub_path
+
+        dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+        for item in dirs:
+            result.append({
+                "type": "directory",
+                "name": item,
+                "path": os.path.join(current_relative, item) if current_relative else item,
+                "children": []
+            })
+            total_dirs += 1
+        if depth == max_depth:
+            # 更深一层的内容不再列出，无需继续下探
+            dirs[:] = []
+
+        for item in files:
+            file_ext = _file_extension(item)
+            if file_ext not in supported_extensions:
+                continue
+            try:
+                size = os.stat(os.path.join(root, item)).st_size
+            except OSError:
+                continue
+            result.append({
+                "type": "file",
+                "name": item,
+                "path": os.path.join(current_relative, item) if current_relative else item,
+                "size": size,
+                "extension": file_ext
+            })
+            total_files += 1
+
+    return tuple(result), total_files, total_dirs
+
+def _resolve_project_root(project_path: str) -> Path:
+    """解析项目根目录的真实路径，一次 resolve 同时完成存在性检查
+    
+    不做缓存：目录被删除或替换为符号链接后必须重新解析，且解析开销远小于随后的文件 IO。
+    """
+    try:
+        root = Path(project_path).resolve(strict=True)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Exception(f"项目路径不存在: {project_path}")
+    
+    # 检查是否是目录
+    if not root.is_dir():
+        raise Exception(f"项目路径不是目录: {project_path}")
+    
+    return root
+
+def _resolve_within(root: Path, relative_path: str) -> Optional[Path]:
+    """解析 root 下的相对路径，结果不在 root 内时返回 None"""
+    candidate = (root / relative_path).resolve()
+    try:
+        candidate.relative_to(root)
+    except ValueError:
+        return None
+    return candidate
+
+def _stat_regular_file(abs_file_path: str, relative_path: str) -> os.stat_result:
+    """一次 stat 同时完成存在性和文件类型检查"""
+    try:
+        st = os.stat(abs_file_path)
+    except FileNotFoundError:
+        raise Exception(f"文件不存在: {relative_path}")
+    
+    if not stat.S_ISREG(st.st_mode):
+        raise Exception(f"路径不是文件: {relative_path}")
+    
+    return st
+
+def _open_regular_file(abs_file_path: str, relative_path: str) -> Tuple[int, os.stat_result]:
+    """打开文件并 fstat 同一描述符，省去单独的 stat 路径查找；O_NONBLOCK 避免在 FIFO 上阻塞"""
+    try:
+        fd = os.open(abs_file_path, os.O_RDONLY | getattr(os, 'O_NONBLOCK', 0))
+    except FileNotFoundError:
+        raise Exception(f"文件不存在: {relative_path}")
+    except IsADirectoryError:
+        raise Exception(f"路径不是文件: {relative_path}")
+    
+    st = os.fstat(fd)
+    if not stat.S_ISREG(st.st_mode):
+        os.close(fd)
+        raise Exception(f"路径不是文件: {relative_path}")
+    
+    return fd, st
 
 class ProjectMCPServer:
     """项目文件读取MCP服务器 - 支持动态项目路径"""
     
-    def __init__(self):
-        self.supported_extensions = {
-            '.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.cpp', '.c', '.h', 
-            '.hpp', '.go', '.rs', '.php', '.rb', '.sh', '.bash', '.sql', 
-            '.html', '.htm', '.css', '.scss', '.sass', '.json', '.yml', '.yaml',
-            '.xml', '.md', '.txt', '.config', '.conf', '.ini', '.toml',
-            '.lock', '.gitignore', '.dockerfile', '.env', '.example'
-        }
+    SUPPORTED_EXTS = frozenset({
+        '.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.cpp', '.c', '.h', 
+        '.hpp', '.go', '.rs', '.php', '.rb', '.sh', '.bash', '.sql', 
+        '.html', '.htm', '.css', '.scss', '.sass', '.json', '.yml', '.yaml',
+        '.xml', '.md', '.txt', '.config', '.conf', '.ini', '.toml',
+        '.lock', '.gitignore', '.dockerfile', '.env', '.example'
+    })
     
     def _validate_project_path(self, project_path: str) -> str:
         """验证项目路径并返回绝对路径"""
         if not project_path:
             raise Exception("项目路径不能为空")
         
-        abs_path = os.path.abspath(project_path)
-        
-        # 检查路径是否存在
-        if not os.path.exists(abs_path):
-            raise Exception(f"项目路径不存在: {project_path}")
-        
-        # 检查是否是目录
-        if not os.path.isdir(abs_path):
-            raise Exception(f"项目路径不是目录: {project_path}")
-        
-        return abs_path
+        return str(_resolve_project_root(project_path))
     
     def _validate_file_path(self, project_path: str, relative_path: str) -> str:
         """验证文件路径安全性"""
-        abs_project_path = self._validate_project_path(project_path)
-        full_path = os.path.join(abs_project_path, relative_path)
-        abs_full_path = os.path.abspath(full_path)
+        root = Path(self._validate_project_path(project_path))
+        candidate = _resolve_within(root, relative_path)
         
-        # 安全检查：确保文件路径在项目目录内
-        if not abs_full_path.startswith(abs_project_path):
+        # 安全检查：确保文件路径在项目目录内（按路径组件比较，/a/foo 不会匹配 /a/foobar）
+        if candidate is None:
             raise Exception("文件路径不在项目目录内")
         
-        return abs_full_path
+        return str(candidate)
     
     async def read_project_file(self, project_path: str, relative_path: str) -> Dict[str, Any]:
+        """读取项目文件内容（阻塞 IO 放到线程池执行，不阻塞事件循环）"""
+        return await asyncio.to_thread(self._read_project_file_sync, project_path, relative_path)
+    
+    def _read_project_file_sync(self, project_path: str, relative_path: str) -> Dict[str, Any]:
         """读取项目文件内容"""
         try:
             abs_file_path = self._validate_file_path(project_path, relative_path)
             
-            if not os.path.exists(abs_file_path):
-                raise Exception(f"文件不存在: {relative_path}")
+            # 整个读取过程只打开一次文件，类型检查和读取都基于同一描述符
+            fd, st = _open_regular_file(abs_file_path, relative_path)
+            try:
+                # 检查文件扩展名
+                file_ext = _file_extension(os.path.basename(abs_file_path))
+                if file_ext not in self.SUPPORTED_EXTS:
+                    raise Exception(f"不支持的文件类型: {file_ext}")
+                
+                # 读取文件内容，超过上限的大文件只读取开头部分
+                truncated = st.st_size > MAX_FILE_BYTES
+                if truncated:
+                    content = _read_text_head(fd, MAX_FILE_BYTES)
+                else:
+                    with open(fd, 'r', encoding='utf-8', closefd=False) as f:
+                        content = f.read()
+            finally:
+                os.close(fd)
             
-            if not os.path.isfile(abs_file_path):
-                raise Exception(f"路径不是文件: {relative_path}")
+            return {
+                "success": True,
+                "content": content,
+                "file_path": relative_path,
+                "absolute_path": abs_file_path,
+                "file_size": st.st_size,
+                "file_type": file_ext,
+                "truncated": truncated,
+                "project_path": project_path
+            }
             
-            # 检查文件扩展名
-            file_ext = Path(abs_file_path).suffix.lower()
-            if file_ext not in self.supported_extensions:
-                raise Exception(f"不支持的文件类型: {file_ext}")
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "file_path": relative_path,
+                "project_path": project_path
+            }
+    
+    async def read_project_file_head(self, project_path: str, relative_path: str, n_bytes: int = 2048) -> Dict[str, Any]:
+        """只读取项目文件开头 n_bytes 字节，用于探测和预览，不读取整个文件"""
+        return await asyncio.to_thread(self._read_project_file_head_sync, project_path, relative_path, n_bytes)
+    
+    def _read_project_file_head_sync(self, project_path: str, relative_path: str, n_bytes: int) -> Dict[str, Any]:
+        """读取项目文件开头部分"""
+        try:
+            abs_file_path = self._validate_file_path(project_path, relative_path)
             
-            # 读取文件内容
-            with open(abs_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            fd, st = _open_regular_file(abs_file_path, relative_path)
+            try:
+                # 检查文件扩展名
+                file_ext = _file_extension(os.path.basename(abs_file_path))
+                if file_ext not in self.SUPPORTED_EXTS:
+                    raise Exception(f"不支持的文件类型: {file_ext}")
+                
+                data = os.read(fd, n_bytes)
+            finally:
+                os.close(fd)
             
+            # 丢弃末尾被截断的不完整 UTF-8 字符
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
             return {
                 "success": True,
-                "content": content,
+                "content": decoder.decode(data, final=False),
                 "file_path": relative_path,
                 "absolute_path": abs_file_path,
-                "file_size": len(content),
+                "file_size": st.st_size,
                 "file_type": file_ext,
+                "truncated": st.st_size > n_bytes,
                 "project_path": project_path
             }
             
@@ -86,15 +261,19 @@ class ProjectMCPServer:
             }
     
     async def list_project_files(self, project_path: str, directory: str = "", max_depth: int = 2) -> Dict[str, Any]:
+        """列出项目文件结构（目录扫描放到线程池执行，不阻塞事件循环）"""
+        return await asyncio.to_thread(self._list_project_files_sync, project_path, directory, max_depth)
+    
+    def _list_project_files_sync(self, project_path: str, directory: str = "", max_depth: int = 2) -> Dict[str, Any]:
         """列出项目文件结构"""
         try:
             abs_project_path = self._validate_project_path(project_path)
-            base_path = os.path.join(abs_project_path, directory)
-            abs_base_path = os.path.abspath(base_path)
+            base = _resolve_within(Path(abs_project_path), directory)
             
             # 安全检查：确保基础路径在项目目录内
-            if not abs_base_path.startswith(abs_project_path):
+            if base is None:
                 raise Exception("目录路径不在项目目录内")
+            abs_base_path = str(base)
             
             if not os.path.exists(abs_base_path):
                 raise Exception(f"目录不存在: {directory}")
@@ -102,59 +281,17 @@ class ProjectMCPServer:
             if not os.path.isdir(abs_base_path):
                 raise Exception(f"路径不是目录: {directory}")
             
-            result = []
-            total_files = 0
-            total_dirs = 0
-            
-            def scan_directory(current_dir: str, current_depth: int, current_relative: str = ""):
-                nonlocal total_files, total_dirs
-                
-                if current_depth > max_depth:
-                    return
-                
-                try:
-                    items = os.listdir(current_dir)
-                    for item in items:
-                        item_path = os.path.join(current_dir, item)
-                        relative_path = os.path.join(current_relative, item) if current_relative else item
-                        
-                        if os.path.isfile(item_path):
-                            file_ext = Path(item_path).suffix.lower()
-                            if file_ext in self.supported_extensions:
-                                result.append({
-                                    "type": "file",
-                                    "name": item,
-                                    "path": relative_path,
-                                    "size": os.path.getsize(item_path),
-                                    "extension": file_ext
-                                })
-                                total_files += 1
-                        
-                        elif os.path.isdir(item_path):
-                            # 忽略一些常见的不需要扫描的目录
-                            if item in {'.git', '__pycache__', 'node_modules', 'dist', 'build', '.vscode', '.idea', '.venv', 'venv', 'env'}:
-                                continue
-                                
-                            dir_info = {
-                                "type": "directory",
-                                "name": item,
-                                "path": relative_path,
-                                "children": []
-                            }
-                            result.append(dir_info)
-                            total_dirs += 1
-                            
-                            # 递归扫描子目录
-                            scan_directory(item_path, current_depth + 1, relative_path)
-                            
-                except PermissionError:
-                    # 忽略权限错误
-                    pass
-                except Exception as e:
-                    # 记录错误但继续扫描
-                    print(f"扫描目录错误 {current_dir}: {e}")
-            
-            scan_directory(abs_base_path, 0, directory)
+            # 以基础目录 mtime 和时间片作为缓存键：目录变化或超过 LIST_CACHE_TTL 秒后重新扫描
+            entries, total_files, total_dirs = _scan_project_files(
+                abs_base_path,
+                directory,
+                max_depth,
+                self.SUPPORTED_EXTS,
+                os.stat(abs_base_path).st_mtime_ns,
+                int(time.monotonic() // LIST_CACHE_TTL)
+            )
+            # 缓存中的条目是共享的，返回副本避免调用方修改污染缓存
+            result = [dict(item, children=[]) if item["type"] == "directory" else dict(item) for item in entries]
             
             return {
                 "success": True,
@@ -179,14 +316,8 @@ class ProjectMCPServer:
         try:
             abs_file_path = self._validate_file_path(project_path, relative_path)
             
-            if not os.path.exists(abs_file_path):
-                raise Exception(f"文件不存在: {relative_path}")
-            
-            if not os.path.isfile(abs_file_path):
-                raise Exception(f"路径不是文件: {relative_path}")
-            
-            stats = os.stat(abs_file_path)
-            file_ext = Path(abs_file_path).suffix.lower()
+            stats = _stat_regular_file(abs_file_path, relative_path)
+            file_ext = _file_extension(os.path.basename(abs_file_path))
             
             return {
                 "success": True,
@@ -211,7 +342,7 @@ class ProjectMCPServer:
     
     def get_supported_extensions(self) -> List[str]:
         """获取支持的文件扩展名列表"""
-        return sorted(list(self.supported_extensions))
+        return sorted(self.SUPPORTED_EXTS)
     
     def get_server_info(self) -> Dict[str, Any]:
         """获取服务器信息"""
@@ -1,25 +1,43 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
+import asyncio
+import signal
+from typing import Any
 from contextlib import asynccontextmanager
 import logging
 
+import orjson
+
+try:
+    import uvloop
+except ImportError:  # uvloop 为可选依赖（不支持 Windows），缺失时使用默认事件循环
+    uvloop = None
+
 from app.api.routes import git, ai, mcp, projects, config, github
-from app.core.config import settings
+from app.core.config import settings, ensure_dirs
 from app.core.git_manager import GitManager
 from app.core.ai_manager import AIManager
 from app.core.mcp_server import McpServer
 from app.core.database import init_db
+from app.services.github_service import close_http_client
+from app.api.routes.github import start_trending_refresher, stop_trending_refresher
+from app.core.advanced_smart_conversation_manager import reload_ai_config
 
 logger = logging.getLogger(__name__)
+logging.getLogger("app").setLevel(logging.DEBUG if settings.debug else logging.INFO)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Git AI Core...")
     
+    # 创建必要的目录
+    ensure_dirs()
+    
     # 初始化数据库
     init_db()
     logger.info("Database initialized")
@@ -33,15 +51,33 @@ async def lifespan(app: FastAPI):
     loaded_count = app.state.git_manager.load_repositories_from_database()
     logger.info(f"Loaded {loaded_count} repositories from database")
     
+    # 后台定期预热热门项目缓存
+    start_trending_refresher()
+    
+    # SIGHUP 时重新加载AI配置；Windows 或非主线程的事件循环不支持信号处理，直接跳过
+    loop = asyncio.get_running_loop()
+    sighup_registered = False
+    if hasattr(signal, "SIGHUP"):
+        try:
+            loop.add_signal_handler(signal.SIGHUP, reload_ai_config)
+            sighup_registered = True
+        except (NotImplementedError, RuntimeError, ValueError) as e:
+            logger.warning(f"SIGHUP handler not installed: {e}")
+    
     yield
     # Shutdown
     logger.info("Shutting down Git AI Core...")
+    if sighup_registered:
+        loop.remove_signal_handler(signal.SIGHUP)
+    await stop_trending_refresher()
+    await close_http_client()
 
 app = FastAPI(
     title="Git AI Core",
     description="AI-powered Git project understanding assistant",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -71,14 +107,28 @@ class ConnectionManager:
         self.active_connections.append(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        # 广播失败时连接可能已被移除
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+        await self._fan_out(lambda connection: connection.send_text(message))
+
+    async def broadcast_json(self, obj: Any):
+        """只序列化一次，以二进制帧并发发送给所有连接"""
+        payload = orjson.dumps(obj)
+        await self._fan_out(lambda connection: connection.send_bytes(payload))
+
+    async def _fan_out(self, send):
+        # 并发发送，单个慢连接不会拖慢其他连接；发送失败的连接直接移除
+        connections = list(self.active_connections)
+        results = await asyncio.gather(*(send(c) for c in connections), return_exceptions=True)
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception) and connection in self.active_connections:
+                self.active_connections.remove(connection)
 
 manager = ConnectionManager()
 
@@ -105,5 +155,6 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=True,
+        loop="uvloop" if uvloop is not None else "asyncio"
     )
@@ -1,34 +1,189 @@
 import httpx
 import asyncio
-import base64
+import heapq
+import orjson
+import math
+import time
+from collections import Counter
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import List, Dict, Optional
 from fastapi import HTTPException
 from app.core.github_recommendation_db import github_recommendation_db
 
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时逐条计算相关性评分
+    np = None
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # h2 为可选依赖，缺失时使用 HTTP/1.1 连接池
+    HTTP2_AVAILABLE = False
+
+GITHUB_API_URL = "https://api.github.com"
+# 固定在共享客户端上的默认请求头，每个请求只需附带各自的认证信息
+GITHUB_DEFAULT_HEADERS = {
+    "Accept": "application/vnd.github.v3+json",
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": "Git-AI-Core"
+}
+
+# 推荐流程中同时进行的搜索请求上限，避免触发 GitHub 二级速率限制
+SEARCH_CONCURRENCY = 5
+_search_semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+
+# GitHub GET 响应缓存的有效期（秒）和最大条目数
+SEARCH_CACHE_TTL = 300
+TRENDING_CACHE_TTL = 3600
+REPO_DETAILS_CACHE_TTL = 900
+README_CACHE_TTL = 3600
+RESPONSE_CACHE_SIZE = 1024
+
+# (路径, 参数, 请求头) -> (过期时间, ETag, 响应内容)；过期条目保留 ETag 用于条件请求
+_response_cache: Dict[tuple, tuple] = {}
+# 每个缓存键一把锁，并发的相同请求只有一个真正访问 GitHub；值为 [锁, 持有或等待该锁的请求数]，
+# 计数归零时才移除，保证同一时刻每个键只有一把锁
+_response_cache_locks: Dict[tuple, list] = {}
+
+@lru_cache(maxsize=256)
+def _query_tokens(query: str) -> tuple:
+    """把查询拆成去重的小写词，空查询保留原串以保持单词查询时的评分语义"""
+    query_lower = query.lower()
+    return tuple(dict.fromkeys(query_lower.split())) or (query_lower,)
+
+def _json(response: httpx.Response):
+    """用 orjson 直接解析响应体，替代基于标准库 json 的 response.json()"""
+    return orjson.loads(response.content)
+
+def _parse_updated_ts(updated_at: Optional[str]) -> Optional[float]:
+    """把 GitHub 的 ISO-8601 更新时间解析为时间戳，缺失或无法解析时返回 None"""
+    if not updated_at:
+        return None
+    try:
+        return datetime.fromisoformat(updated_at.replace('Z', '+00:00')).timestamp()
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def _repo_features(repo: Dict) -> tuple:
+    """提取评分用的派生字段：(小写名称, 小写完整名称, 小写描述, 小写语言, 更新时间戳)
+    
+    派生值单独返回而不写回仓库数据，避免私有字段进入响应缓存和 API 返回结果。
+    """
+    return (
+        (repo.get("name") or "").lower(),
+        (repo.get("full_name") or "").lower(),
+        (repo.get("description") or "").lower(),
+        (repo.get("language") or "").lower(),
+        _parse_updated_ts(repo.get("updated_at"))
+    )
+
+# 进程内共享的 GitHub API 客户端，复用连接避免每次请求重新握手
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享的 httpx 客户端，首次使用时创建"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=GITHUB_API_URL,
+            headers=GITHUB_DEFAULT_HEADERS,
+            timeout=30.0,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+        )
+    return _http_client
+
+async def close_http_client():
+    """关闭共享的 httpx 客户端，在应用关闭时调用"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 class GitHubService:
     def __init__(self, access_token: str = None):
         self.access_token = access_token
-        self.base_url = "https://api.github.com"
-        self.headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "User-Agent": "Git-AI-Core"
-        }
+        self.base_url = GITHUB_API_URL
+        self.headers = {}
         if access_token:
             self.headers["Authorization"] = f"token {access_token}"
 
-    async def get_weekly_trending(self) -> List[Dict]:
-        """获取过去一周最火的10个项目"""
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        """进程内共享的客户端，按需创建（关闭后再次使用会重新创建）"""
+        return get_http_client()
+
+    async def aclose(self):
+        """关闭共享的 HTTP 客户端"""
+        await close_http_client()
+
+    async def _cached_get(self, path: str, ttl: float, params: Dict = None,
+                          headers: Dict = None, parse=None, refresh: bool = False):
+        """带TTL缓存的GET请求，返回 parse(response) 的结果（默认为JSON）；HTTP错误原样抛出且不缓存
+        
+        缓存过期后携带 If-None-Match 发起条件请求，GitHub 返回 304 时不消耗速率限制额度。
+        refresh 为 True 时忽略有效期立即重新验证，用于后台预热。
+        """
+        headers = self.headers if headers is None else headers
+        key = (
+            path,
+            tuple(sorted(params.items())) if params else (),
+            tuple(sorted(headers.items()))
+        )
+        
+        entry = _response_cache.get(key)
+        if not refresh and entry is not None and entry[0] > time.monotonic():
+            return entry[2]
+        
+        slot = _response_cache_locks.get(key)
+        if slot is None:
+            slot = _response_cache_locks[key] = [asyncio.Lock(), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                # 等锁期间其他请求可能已经刷新了缓存
+                entry = _response_cache.get(key)
+                if not refresh and entry is not None and entry[0] > time.monotonic():
+                    return entry[2]
+                
+                request_headers = headers
+                if entry is not None and entry[1]:
+                    request_headers = {**headers, "If-None-Match": entry[1]}
+                
+                response = await self._client.get(path, params=params, headers=request_headers)
+                if response.status_code == 304 and entry is not None:
+                    # 内容未变化，沿用缓存内容并延长有效期
+                    etag, payload = entry[1], entry[2]
+                else:
+                    response.raise_for_status()
+                    etag, payload = response.headers.get("ETag"), (parse or _json)(response)
+                
+                _response_cache.pop(key, None)
+                _response_cache[key] = (time.monotonic() + ttl, etag, payload)
+                while len(_response_cache) > RESPONSE_CACHE_SIZE:
+                    del _response_cache[next(iter(_response_cache))]
+                return payload
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                _response_cache_locks.pop(key, None)
+
+    async def get_weekly_trending(self, refresh: bool = False) -> List[Dict]:
+        """获取过去一周最火的10个项目，refresh 为 True 时跳过缓存有效期重新获取"""
         since_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
         query = f"stars:>100 pushed:>{since_date}"
         
         try:
-            return await self.search_repos(query, sort="stars", order="desc", per_page=10)
+            return await self.search_repos(query, sort="stars", order="desc", per_page=10,
+                                           cache_ttl=TRENDING_CACHE_TTL, refresh=refresh)
         except Exception as e:
             print(f"获取trending项目失败: {e}")
             return []
 
-    async def search_repos(self, query: str, sort: str = "stars", order: str = "desc", per_page: int = 10) -> List[Dict]:
+    async def search_repos(self, query: str, sort: str = "stars", order: str = "desc", per_page: int = 10,
+                           cache_ttl: float = SEARCH_CACHE_TTL, refresh: bool = False) -> List[Dict]:
         """搜索GitHub仓库"""
         params = {
             "q": query,
@@ -38,15 +193,13 @@ class GitHubService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/search/repositories",
-                    params=params,
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()["items"]
+            return await self._cached_get(
+                "/search/repositories",
+                cache_ttl,
+                params=params,
+                parse=lambda response: _json(response)["items"],
+                refresh=refresh
+            )
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 403:
                 raise HTTPException(status_code=429, detail="GitHub API速率限制，请稍后再试")
@@ -57,14 +210,9 @@ class GitHubService:
     async def get_repo_details(self, owner: str, repo: str) -> Dict:
         """获取仓库详细信息"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/repos/{owner}/{repo}",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
+            details = await self._cached_get(f"/repos/{owner}/{repo}", REPO_DETAILS_CACHE_TTL)
+            # 返回副本，调用方添加字段（如readme）不会污染缓存
+            return dict(details)
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 raise HTTPException(status_code=404, detail="仓库不存在")
@@ -75,18 +223,13 @@ class GitHubService:
     async def get_readme(self, owner: str, repo: str) -> Optional[str]:
         """获取README内容"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/repos/{owner}/{repo}/readme",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                # 解码base64内容
-                if data.get("content"):
-                    return base64.b64decode(data["content"]).decode('utf-8')
-                return None
+            # 直接请求原始内容，省去JSON解析和base64解码
+            return await self._cached_get(
+                f"/repos/{owner}/{repo}/readme",
+                README_CACHE_TTL,
+                headers={**self.headers, "Accept": "application/vnd.github.raw"},
+                parse=lambda response: response.content.decode('utf-8', errors='replace') or None
+            )
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 return None  # README不存在
@@ -94,28 +237,78 @@ class GitHubService:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"获取README失败: {str(e)}")
 
+    async def get_repo_bundle(self, owner: str, repo: str) -> Dict:
+        """并发获取仓库详情和README，返回 {"details": ..., "readme": ...}"""
+        details, readme = await asyncio.gather(
+            self.get_repo_details(owner, repo),
+            self.get_readme(owner, repo),
+            return_exceptions=True
+        )
+        # 仓库详情失败时按原错误抛出，README失败不影响详情展示
+        if isinstance(details, BaseException):
+            raise details
+        if isinstance(readme, BaseException):
+            print(f"获取README失败 {owner}/{repo}: {readme}")
+            readme = None
+        return {"details": details, "readme": readme}
+
+    async def _search_many(self, searches: List[tuple], limit: Optional[int] = None) -> List[Dict]:
+        """并发执行多个 (查询, 每页数量) 搜索，按原顺序合并并去重（保留首次出现）；单个搜索失败只记录日志
+        
+        limit 不为空时收集到 limit 个不重复项目即停止，尚未完成的搜索（多为仍在等待信号量的请求）会被取消，
+        不再消耗 GitHub API 额度。
+        """
+        async def bounded_search(query: str, per_page: int) -> List[Dict]:
+            async with _search_semaphore:
+                return await self.search_repos(query, sort="stars", order="desc", per_page=per_page)
+        
+        tasks = [asyncio.ensure_future(bounded_search(query, per_page)) for query, per_page in searches]
+        seen = set()
+        repos = []
+        try:
+            # 按搜索顺序依次等待，保证结果顺序稳定
+            for (query, _), task in zip(searches, tasks):
+                try:
+                    result = await task
+                except Exception as e:
+                    print(f"推荐搜索失败 {query}: {e}")
+                    continue
+                for repo in result:
+                    if repo["full_name"] not in seen:
+                        seen.add(repo["full_name"])
+                        repos.append(repo)
+                        if limit is not None and len(repos) >= limit:
+                            return repos
+            return repos
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # 提前返回时取走已完成任务的异常，避免 "exception was never retrieved" 警告
+                    task.exception()
+
     async def test_connection(self) -> Dict:
         """测试GitHub连接"""
         if not self.access_token:
             return {"success": False, "error": "未提供access token"}
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/user",
-                    headers=self.headers,
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                user_data = response.json()
-                return {
-                    "success": True,
-                    "user": {
-                        "login": user_data.get("login"),
-                        "name": user_data.get("name"),
-                        "avatar_url": user_data.get("avatar_url")
-                    }
+            response = await self._client.get(
+                "/user",
+                headers=self.headers,
+                timeout=10.0
+            )
+            response.raise_for_status()
+            user_data = _json(response)
+            return {
+                "success": True,
+                "user": {
+                    "login": user_data.get("login"),
+                    "name": user_data.get("name"),
+                    "avatar_url": user_data.get("avatar_url")
                 }
+            }
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 401:
                 return {"success": False, "error": "Access token无效"}
@@ -145,115 +338,160 @@ class GitHubService:
             sort_by = "stars"
             order = "desc"
         
-        # 获取基础搜索结果
+        # 获取基础搜索结果：只有需要本地重排时才多取一倍候选，否则按需获取
+        fetch_count = min(per_page * 2, 50) if not sort else per_page
         print(f"增强搜索查询: {search_query}, 排序: {sort_by}, 顺序: {order}")  # 调试信息
-        repos = await self.search_repos(search_query, sort_by, order, min(per_page * 2, 50))
+        repos = await self.search_repos(search_query, sort_by, order, fetch_count)
         
         # 应用智能排序（如果是默认排序）
         if not sort:
-            scored_repos = []
-            for repo in repos:
-                score = self._calculate_relevance_score(repo, query)
-                scored_repos.append((score, repo))
+            # 查询分词和当前时间每次搜索只计算一次，由整批评分共用
+            scores = self._score_batch(repos, _query_tokens(query), time.time())
             
-            # 按相关性排序并限制结果数量
-            scored_repos.sort(key=lambda x: x[0], reverse=True)
-            result_repos = [repo for score, repo in scored_repos[:per_page]]
+            # 按相关性排序并限制结果数量（稳定排序，同分保持 GitHub 原顺序）
+            order = sorted(range(len(repos)), key=scores.__getitem__, reverse=True)
+            result_repos = [repos[i] for i in order[:per_page]]
         else:
             # 直接使用GitHub API的排序结果
             result_repos = repos[:per_page]
         
-        # 记录搜索行为
-        for repo in result_repos:
-            github_recommendation_db.record_user_action(
-                "default", repo["full_name"], "search", query
-            )
-            github_recommendation_db.cache_repo_features(repo)
+        # 记录搜索行为并缓存项目特征，两者在同一事务中批量写入
+        github_recommendation_db.record_search_results("default", query, result_repos)
         
         return result_repos
 
-    def _calculate_relevance_score(self, repo: Dict, query: str) -> float:
-        """计算项目与查询的相关性评分"""
-        score = 0.0
-        query_lower = query.lower()
-        
-        # 名称匹配权重最高 (40%)
-        name = repo.get("name", "").lower()
-        if query_lower in name:
-            score += 0.4
-        
-        # 完整名称匹配 (额外30%)
-        full_name = repo.get("full_name", "").lower()
-        if query_lower in full_name:
-            score += 0.3
+    def _score_batch(self, repos: List[Dict], tokens: tuple, now_ts: float) -> List[float]:
+        """批量计算相关性评分，规则与 _calculate_relevance_score 相同；有 numpy 时整批向量化计算
+        
+        tokens 为 _query_tokens 的分词结果，now_ts 为整批共用的当前时间戳。
+        """
+        # 派生字段每个仓库只计算一次，存放在与 repos 平行的列表中
+        features = [_repo_features(repo) for repo in repos]
+        if np is None or not repos:
+            return [self._score_tokens(repo, tokens, now_ts, feature) for repo, feature in zip(repos, features)]
+        
+        weight = 1.0 / len(tokens)
+        count = len(repos)
+        
+        names_list, full_names_list, descriptions_list, languages_list, updated_list = zip(*features)
+        names = np.array(names_list)
+        full_names = np.array(full_names_list)
+        descriptions = np.array(descriptions_list)
+        languages = np.array(languages_list)
+        
+        has_description = descriptions != ""
+        has_language = languages != ""
+        
+        # 名称 40%、完整名称 30%、描述 20%、语言 10%，多词查询按命中词的比例计分
+        score = np.zeros(count)
+        for token in tokens:
+            score += weight * (
+                0.4 * (np.char.find(names, token) >= 0)
+                + 0.3 * (np.char.find(full_names, token) >= 0)
+                + 0.2 * (has_description & (np.char.find(descriptions, token) >= 0))
+                + 0.1 * (has_language & (languages == token))
+            )
         
-        # 描述匹配权重 (20%)
-        description = repo.get("description", "").lower()
-        if description and query_lower in description:
-            score += 0.2
+        # 质量加成：星标数和更新活跃度（无法解析的更新时间为 NaN，不加分）
+        stars = np.fromiter((repo.get("stargazers_count") or 0 for repo in repos), dtype=float, count=count)
+        days = np.fromiter((self._days_since_update(updated_ts, now_ts) for updated_ts in updated_list), dtype=float, count=count)
+        bonus = np.minimum(stars / 5000, 0.5) + np.where(days <= 30, 0.3, np.where(days <= 90, 0.1, 0.0))
+        bonus = np.minimum(bonus, 0.7)
         
-        # 语言匹配权重 (10%)
-        repo_language = repo.get("language", "").lower()
-        if repo_language and query_lower == repo_language:
-            score += 0.1
+        return np.minimum(score + bonus * 0.2, 1.0).tolist()
+
+    @staticmethod
+    def _days_since_update(updated_ts: Optional[float], now_ts: float) -> float:
+        """距上次更新的整天数（向下取整），更新时间缺失或无法解析时返回 NaN"""
+        if updated_ts is None:
+            return float("nan")
+        return float(math.floor((now_ts - updated_ts) / 86400))
+
+    def _calculate_relevance_score(self, repo: Dict, query: str, now_ts: Optional[float] = None) -> float:
+        """计算项目与查询的相关性评分，多词查询按命中词的比例计分"""
+        return self._score_tokens(repo, _query_tokens(query), now_ts)
+
+    def _score_tokens(self, repo: Dict, tokens: tuple, now_ts: Optional[float] = None,
+                      features: Optional[tuple] = None) -> float:
+        """按已分好的查询词为单个项目评分，批量评分时分词和派生字段都只计算一次"""
+        score = 0.0
+        weight = 1.0 / len(tokens)
+        
+        if features is None:
+            features = _repo_features(repo)
+        name, full_name, description, repo_language, updated_ts = features
+        
+        for token in tokens:
+            token_score = 0.0
+            # 名称匹配权重最高 (40%)
+            if token in name:
+                token_score += 0.4
+            # 完整名称匹配 (额外30%)
+            if token in full_name:
+                token_score += 0.3
+            # 描述匹配权重 (20%)
+            if description and token in description:
+                token_score += 0.2
+            # 语言匹配权重 (10%)
+            if repo_language and token == repo_language:
+                token_score += 0.1
+            score += weight * token_score
         
         # 质量加成 (基于星标和更新时间的综合评分)
-        quality_bonus = self._calculate_quality_bonus(repo)
+        quality_bonus = self._calculate_quality_bonus(repo, now_ts, updated_ts)
         score += quality_bonus * 0.2  # 质量最多贡献20%
         
         return min(score, 1.0)  # 确保不超过1.0
 
-    def _calculate_quality_bonus(self, repo: Dict) -> float:
-        """计算质量加成分数"""
+    def _calculate_quality_bonus(self, repo: Dict, now_ts: Optional[float] = None,
+                                 updated_ts: Optional[float] = None) -> float:
+        """计算质量加成分数，now_ts 和已解析的 updated_ts 由批量调用方传入，避免重复取时间和解析日期"""
         bonus = 0.0
         
         # 星标数加成
-        stars = repo.get("stargazers_count", 0)
+        stars = repo.get("stargazers_count") or 0
         bonus += min(stars / 5000, 0.5)  # 每5000星加0.5分，最多0.5分
         
-        # 更新活跃度加成
-        if repo.get("updated_at"):
-            try:
-                updated_at = datetime.fromisoformat(repo["updated_at"].replace('Z', '+00:00'))
-                days_since_update = (datetime.now() - updated_at).days
-                if days_since_update <= 30:  # 30天内更新
-                    bonus += 0.3
-                elif days_since_update <= 90:  # 90天内更新
-                    bonus += 0.1
-            except:
-                pass
+        # 更新活跃度加成（NaN 与任何数比较均为 False，不加分）
+        # 统一按 Unix 时间戳计算；早先 naive 的 datetime.now() 与带时区的 updated_at 相减
+        # 抛出的 TypeError 被吞掉，这项加成实际从未生效
+        if updated_ts is None:
+            updated_ts = _parse_updated_ts(repo.get("updated_at"))
+        days_since_update = self._days_since_update(updated_ts, time.time() if now_ts is None else now_ts)
+        if days_since_update <= 30:  # 30天内更新
+            bonus += 0.3
+        elif days_since_update <= 90:  # 90天内更新
+            bonus += 0.1
         
         return min(bonus, 0.7)  # 质量加成最多0.7分
 
     async def get_personalized_recommendations(self, user_id: str = "default", limit: int = 10) -> List[Dict]:
         """获取个性化推荐"""
-        # 获取用户历史行为
-        user_actions = github_recommendation_db.get_user_actions(user_id)
-        
-        recommendations = []
-        
-        # 策略1: 基于热度的推荐 (30%)
-        trending_recs = await self.get_weekly_trending()
-        if trending_recs:
-            recommendations.extend([(0.3, rec, "trending") for rec in trending_recs[:3]])
-        
-        # 策略2: 基于内容的推荐 (40%)
-        if user_actions:
-            content_recs = await self._get_content_based_recommendations(user_actions, limit=4)
-            if content_recs:
-                recommendations.extend([(0.4, rec, "personalized") for rec in content_recs])
+        # 获取用户历史行为（按项目和行为类型在 SQL 中聚合）
+        user_stats = github_recommendation_db.get_user_repo_stats(user_id)
+        
+        # 权重和项目分别存放在平行列表中，避免为每条推荐构造元组
+        weights: List[float] = []
+        candidates: List[Dict] = []
+        
+        # 三种推荐策略互不依赖，并发执行
+        trending_recs, content_recs, explore_recs = await asyncio.gather(
+            self.get_weekly_trending(),
+            self._get_content_based_recommendations(user_stats, limit=4),
+            self._get_exploratory_recommendations(user_stats, limit=3)
+        )
         
-        # 策略3: 探索性推荐 (30%)
-        explore_recs = await self._get_exploratory_recommendations(user_actions, limit=3)
-        if explore_recs:
-            recommendations.extend([(0.3, rec, "explore") for rec in explore_recs])
+        # 策略1: 基于热度的推荐 (30%)、策略2: 基于内容的推荐 (40%)、策略3: 探索性推荐 (30%)
+        for weight, recs in ((0.3, trending_recs[:3]), (0.4, content_recs), (0.3, explore_recs)):
+            weights.extend([weight] * len(recs))
+            candidates.extend(recs)
         
         # 如果没有推荐结果，返回空列表
-        if not recommendations:
+        if not candidates:
             return []
         
         # 去重、排序和限制结果
-        final_recommendations = self._deduplicate_and_sort_recommendations(recommendations, limit)
+        final_recommendations = self._deduplicate_and_sort_recommendations(weights, candidates, limit)
         
         # 记录推荐历史
         for repo in final_recommendations:
@@ -263,112 +501,81 @@ class GitHubService:
         
         return final_recommendations
 
-    async def _get_content_based_recommendations(self, user_actions: List[Dict], limit: int = 4) -> List[Dict]:
+    async def _get_content_based_recommendations(self, user_stats: Dict[str, Dict], limit: int = 4) -> List[Dict]:
         """基于用户历史行为的推荐"""
-        if not user_actions:
+        if not user_stats:
             return []
         
         # 分析用户偏好
-        user_preferences = self._analyze_user_preferences(user_actions)
+        user_preferences = self._analyze_user_preferences(user_stats)
         
-        recommendations = []
+        searches = []
         
         # 基于语言的推荐
-        if user_preferences.get('languages'):
-            for language in user_preferences['languages'][:3]:  # 取前3个最常用的语言
-                language_repos = await self.search_repos(
-                    f"stars:>100 language:{language}", 
-                    sort="stars", 
-                    order="desc", 
-                    per_page=5
-                )
-                recommendations.extend(language_repos)
+        for language in user_preferences.get('languages', [])[:3]:  # 取前3个最常用的语言
+            searches.append((f"stars:>100 language:{language}", 5))
         
         # 基于主题的推荐
-        if user_preferences.get('topics'):
-            for topic in user_preferences['topics'][:2]:  # 取前2个最感兴趣的主题
-                topic_repos = await self.search_repos(
-                    f"stars:>50 topic:{topic}", 
-                    sort="stars", 
-                    order="desc", 
-                    per_page=3
-                )
-                recommendations.extend(topic_repos)
-        
-        # 去重
-        seen = set()
-        unique_recommendations = []
-        for repo in recommendations:
-            if repo["full_name"] not in seen:
-                seen.add(repo["full_name"])
-                unique_recommendations.append(repo)
+        for topic in user_preferences.get('topics', [])[:2]:  # 取前2个最感兴趣的主题
+            searches.append((f"stars:>50 topic:{topic}", 3))
         
-        return unique_recommendations[:limit]
+        # 合并时即去重并截取前 limit 个
+        return await self._search_many(searches, limit)
 
-    def _analyze_user_preferences(self, user_actions: List[Dict]) -> Dict:
-        """分析用户偏好"""
+    def _analyze_user_preferences(self, user_stats: Dict[str, Dict]) -> Dict:
+        """分析用户偏好，user_stats 为 get_user_repo_stats 的聚合结果"""
         preferences = {
-            'languages': {},
-            'topics': {},
-            'action_types': {}
+            'languages': Counter(),
+            'topics': Counter(),
+            'action_types': Counter()
         }
         
-        for action in user_actions:
-            repo_full_name = action['repo_full_name']
-            cached_repo = github_recommendation_db.get_cached_repo(repo_full_name)
+        # 所有项目的缓存信息通过一次 IN 查询取回
+        cached_repos = github_recommendation_db.get_cached_repos_bulk(user_stats.keys())
+        
+        for repo_full_name, actions in user_stats.items():
+            # 同一项目的多次行为按次数累加权重
+            repo_count = sum(stat['count'] for stat in actions.values())
+            cached_repo = cached_repos.get(repo_full_name)
             
             if cached_repo:
                 # 分析语言偏好
                 language = cached_repo.get('language')
                 if language:
-                    preferences['languages'][language] = preferences['languages'].get(language, 0) + 1
+                    preferences['languages'][language] += repo_count
                 
                 # 分析主题偏好
                 topics = cached_repo.get('topics', []) or []
                 for topic in topics:
-                    preferences['topics'][topic] = preferences['topics'].get(topic, 0) + 1
+                    preferences['topics'][topic] += repo_count
             
             # 分析行为类型偏好
-            action_type = action['action_type']
-            preferences['action_types'][action_type] = preferences['action_types'].get(action_type, 0) + 1
+            for action_type, stat in actions.items():
+                preferences['action_types'][action_type] += stat['count']
         
-        # 排序并返回前几个
+        # 取出现次数最多的前几个，most_common 内部用堆选取，无需全量排序
         return {
-            'languages': sorted(preferences['languages'].keys(), 
-                               key=lambda x: preferences['languages'][x], reverse=True)[:5],
-            'topics': sorted(preferences['topics'].keys(), 
-                            key=lambda x: preferences['topics'][x], reverse=True)[:5],
-            'action_types': preferences['action_types']
+            'languages': [language for language, _ in preferences['languages'].most_common(5)],
+            'topics': [topic for topic, _ in preferences['topics'].most_common(5)],
+            'action_types': dict(preferences['action_types'])
         }
 
-    async def _get_exploratory_recommendations(self, user_actions: List[Dict], limit: int = 3) -> List[Dict]:
+    async def _get_exploratory_recommendations(self, user_stats: Dict[str, Dict], limit: int = 3) -> List[Dict]:
         """探索性推荐（新项目、不同技术栈等）"""
-        recommendations = []
+        searches = []
         
         # 获取用户偏好
-        user_preferences = self._analyze_user_preferences(user_actions) if user_actions else {}
+        user_preferences = self._analyze_user_preferences(user_stats) if user_stats else {}
         user_languages = set(user_preferences.get('languages', []))
         
         # 推荐新兴技术项目
         emerging_techs = ['rust', 'typescript', 'go', 'kotlin', 'swift']
         for tech in emerging_techs:
             if tech not in user_languages:  # 推荐用户未使用的新技术
-                tech_repos = await self.search_repos(
-                    f"stars:>500 language:{tech} created:>2023-01-01", 
-                    sort="stars", 
-                    order="desc", 
-                    per_page=2
-                )
-                recommendations.extend(tech_repos)
+                searches.append((f"stars:>500 language:{tech} created:>2023-01-01", 2))
         
         # 推荐高质量的新项目
-        new_repos = await self.search_repos(
-            "stars:>100 created:>2024-01-01", 
-            sort="stars", 
-            order="desc", 
-            per_page=3
-        )
-        recommendations.extend(new_repos)
+        searches.append(("stars:>100 created:>2024-01-01", 3))
         
         # 推荐热门但用户可能没接触过的项目
         if user_languages:
@@ -376,37 +583,24 @@ class GitHubService:
             popular_languages = ['python', 'javascript', 'java', 'c++', 'c#']
             for lang in popular_languages:
                 if lang not in user_languages:
-                    lang_repos = await self.search_repos(
-                        f"stars:>1000 language:{lang}", 
-                        sort="stars", 
-                        order="desc", 
-                        per_page=2
-                    )
-                    recommendations.extend(lang_repos)
-        
-        # 去重
-        seen = set()
-        unique_recommendations = []
-        for repo in recommendations:
-            if repo["full_name"] not in seen:
-                seen.add(repo["full_name"])
-                unique_recommendations.append(repo)
+                    searches.append((f"stars:>1000 language:{lang}", 2))
         
-        return unique_recommendations[:limit]
+        # 合并时即去重并截取前 limit 个
+        return await self._search_many(searches, limit)
 
-    def _deduplicate_and_sort_recommendations(self, recommendations: List, limit: int) -> List[Dict]:
-        """去重和排序推荐结果"""
-        if not recommendations:
+    def _deduplicate_and_sort_recommendations(self, weights: List[float], repos: List[Dict], limit: int) -> List[Dict]:
+        """去重和排序推荐结果，weights 与 repos 为一一对应的平行列表"""
+        if not repos:
             return []
-            
-        seen = set()
-        unique_recommendations = []
         
-        for weight, repo, rec_type in recommendations:
+        # 只记录首次出现的下标，去重时不复制权重和项目
+        seen = set()
+        unique_indices = []
+        for index, repo in enumerate(repos):
             if repo["full_name"] not in seen:
                 seen.add(repo["full_name"])
-                unique_recommendations.append((weight, repo))
+                unique_indices.append(index)
         
-        # 按权重排序
-        unique_recommendations.sort(key=lambda x: x[0], reverse=True)
-        return [repo for weight, repo in unique_recommendations[:limit]]
+        # 只选出权重最高的 limit 个，无需全量排序（同权重保持原顺序）
+        top = heapq.nlargest(limit, unique_indices, key=weights.__getitem__)
+        return [repos[index] for index in top]
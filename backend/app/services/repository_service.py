@@ -1,12 +1,34 @@
 from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import os
 import logging
 
 from app.models.repository import Repository
 
 logger = logging.getLogger(__name__)
 
+# 清理无效路径时流式读取的批大小与并发检查路径的线程数
+CLEANUP_BATCH_SIZE = 200
+PATH_CHECK_WORKERS = 16
+
+def resolve_path(path: str) -> str:
+    """规范化仓库路径，仓库记录与 GitManager 共用同一套规则
+    
+    已是规范化绝对路径时直接返回，省去 realpath 系统调用；其余输入（相对路径、含 .. 等）
+    才完整解析。不缓存结果：目录被删除、重建或替换为符号链接后必须重新解析。
+    """
+    if os.path.isabs(path) and path == os.path.normpath(path):
+        return path
+    return str(Path(path).resolve())
+
+def _path_exists(row: Tuple[int, str]) -> Tuple[int, str, bool]:
+    """检查单条记录的路径是否存在，供线程池并发调用"""
+    repo_id, local_path = row
+    return repo_id, local_path, Path(local_path).exists()
+
 class RepositoryService:
     """仓库信息服务 - 管理仓库路径索引"""
     
@@ -17,7 +39,7 @@ class RepositoryService:
         """添加仓库到数据库"""
         try:
             # 规范化路径
-            normalized_path = str(Path(local_path).resolve())
+            normalized_path = resolve_path(local_path)
             
             # 检查是否已存在
             existing = self.db.query(Repository).filter(
@@ -52,7 +74,7 @@ class RepositoryService:
     def remove_repository(self, local_path: str) -> bool:
         """从数据库移除仓库"""
         try:
-            normalized_path = str(Path(local_path).resolve())
+            normalized_path = resolve_path(local_path)
             repo = self.db.query(Repository).filter(
                 Repository.local_path == normalized_path
             ).first()
@@ -76,7 +98,7 @@ class RepositoryService:
     
     def get_repository_by_path(self, local_path: str) -> Optional[Repository]:
         """根据路径获取仓库"""
-        normalized_path = str(Path(local_path).resolve())
+        normalized_path = resolve_path(local_path)
         return self.db.query(Repository).filter(
             Repository.local_path == normalized_path
         ).first()
@@ -84,7 +106,7 @@ class RepositoryService:
     def update_last_accessed(self, local_path: str) -> bool:
         """更新最后访问时间"""
         try:
-            normalized_path = str(Path(local_path).resolve())
+            normalized_path = resolve_path(local_path)
             repo = self.db.query(Repository).filter(
                 Repository.local_path == normalized_path
             ).first()
@@ -105,7 +127,7 @@ class RepositoryService:
     def update_repository_last_updated(self, local_path: str) -> bool:
         """更新仓库最后访问时间（用于记录git pull操作时间）"""
         try:
-            normalized_path = str(Path(local_path).resolve())
+            normalized_path = resolve_path(local_path)
             repo = self.db.query(Repository).filter(
                 Repository.local_path == normalized_path
             ).first()
@@ -127,15 +149,31 @@ class RepositoryService:
     def cleanup_invalid_paths(self) -> int:
         """清理无效路径的记录"""
         try:
-            repos = self.get_all_repositories()
+            # 流式读取 id 和路径两列，按批并发检查路径并删除该批的无效记录后再取下一批，
+            # 内存占用只与批大小有关（executor.map 会一次性提交整个迭代器，因此先用 islice 切批）
+            rows = iter(
+                self.db.query(Repository.id, Repository.local_path).yield_per(CLEANUP_BATCH_SIZE)
+            )
             removed_count = 0
-            
-            for repo in repos:
-                if not Path(repo.local_path).exists():
-                    self.db.delete(repo)
-                    removed_count += 1
-                    logger.info(f"Cleaned up invalid path: {repo.local_path}")
-            
+            with ThreadPoolExecutor(max_workers=PATH_CHECK_WORKERS) as executor:
+                while True:
+                    batch = list(islice(rows, CLEANUP_BATCH_SIZE))
+                    if not batch:
+                        break
+                    invalid_ids = []
+                    for repo_id, local_path, exists in executor.map(_path_exists, batch):
+                        if not exists:
+                            invalid_ids.append(repo_id)
+                            logger.info(f"Cleaned up invalid path: {local_path}")
+                    
+                    # 本批无效记录用一条 DELETE ... WHERE id IN (...) 删除
+                    if invalid_ids:
+                        self.db.query(Repository).filter(
+                            Repository.id.in_(invalid_ids)
+                        ).delete(synchronize_session=False)
+                        removed_count += len(invalid_ids)
+            
+            # 所有批次在同一事务中提交
             if removed_count > 0:
                 self.db.commit()
             
@@ -55,8 +55,10 @@ export const api = {
     return response.data
   },
 
-  async getProjectStatus(projectPath: string) {
-    const response = await apiClient.get(`/api/git/projects/${encodeURIComponent(projectPath)}/status`)
+  async getProjectStatus(projectPath: string, refresh = false) {
+    const response = await apiClient.get(`/api/git/projects/${encodeURIComponent(projectPath)}/status`, {
+      params: { refresh }
+    })
     return response.data
   },
 